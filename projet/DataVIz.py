@@ -1,8 +1,35 @@
+import os
+import time
 import streamlit as st
 from functions import *
+from profiling import profiled
 
 # In this file we call every functions for the data visualisation
 
+DATA_PATH = './projet/data_regional.csv'
+GEOJSON_PATH = './projet/regions.geojson'
+# geolocated incidents (longitude, latitude, classe, annee), joined to the regions when the file exists
+POINTS_PATH = './projet/points.csv'
+
+# Each section loads only what it needs, so the data, the cube and the geometry are only read
+# when a section using them is opened (and then served from the cache).
+SECTIONS = {
+    "Data table": lambda: print_table(load_table_index(DATA_PATH)),
+    "Crimes by region and year": lambda: ensemble_viz_faits_region(load_cube(DATA_PATH)),
+    "Pie chart": lambda: plot_pie_chart(load_cube(DATA_PATH)),
+    "Crime map": lambda: plot_mapbox(load_cube(DATA_PATH), load_geometry_store(GEOJSON_PATH)),
+    "3D bar map": lambda: plot_3d_barchart_map(load_cube(DATA_PATH), load_geometry_store(GEOJSON_PATH)),
+    "Victims / accused": lambda: courbes_vict_mec(load_cube(DATA_PATH)),
+    "Crime rate map": lambda: map_taux_crim(load_cube(DATA_PATH), load_geometry_store(GEOJSON_PATH)),
+}
+POINT_SECTIONS = {
+    "Incident map": lambda: plot_mapbox(load_point_cube(POINTS_PATH, GEOJSON_PATH, DATA_PATH),
+                                        load_geometry_store(GEOJSON_PATH)),
+    "Incident rate map": lambda: map_taux_crim(load_point_cube(POINTS_PATH, GEOJSON_PATH, DATA_PATH),
+                                               load_geometry_store(GEOJSON_PATH)),
+}
+
+@profiled
 def page_data_visualisation():
     st.title("Regional statistical bases for delinquency recorded by the national police and gendarmerie")
 
@@ -15,20 +42,18 @@ def page_data_visualisation():
     This project is crucial because understanding crime trends can empower us to create safer communities for everyone.
     """)
     
+    # only the selected section is computed, the others cost nothing on this rerun
+    sections = dict(SECTIONS, **(POINT_SECTIONS if os.path.exists(POINTS_PATH) else {}))
+    section = st.radio("Select the section :", list(sections), horizontal=True)
+
+    start = time.perf_counter()
     try:
-        gdf = load_geojson('./projet/regions.geojson')
-        df = load_data('./projet/data_regional.csv')
-        
-        print_table(df)
-        ensemble_viz_faits_region(df)
-        plot_pie_chart(df)
-        plot_mapbox(df, gdf)
-        plot_3d_barchart_map(df, gdf)
-        courbes_vict_mec(df)
-        map_taux_crim(df, gdf)
-        
+        sections[section]()
     except FileNotFoundError:
         st.error("The data file was not found. Please upload a valid CSV file.")
+        return
+
+    show_figure_cache_stats(time.perf_counter() - start)
 
 if __name__ == "__main__":
     page_data_visualisation()
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Compares the 3D bar map as it was first written (one trace per fact row and per polygon ring,
+# centroids of the merged rows) with figures.build_3d_barchart_figure used by the app (one trace
+# per classe on a cube built once), and checks that both draw the same facts per classe.
+# Run from anywhere with: python projet/benchmarks/bench_3d_barchart.py
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from cube import FactCube
+from data_store import read_regional_data
+from figures import build_3d_barchart_figure
+from geometry_store import read_geometry_store
+
+warnings.filterwarnings('ignore', message='.*geographic CRS.*')
+
+
+def baseline_3d_barchart(df, gdf):
+    # plot_3d_barchart_map before the cube and the geometry store, without the streamlit calls
+    # (and on copies, the first version converted the columns of its arguments in place)
+    df = df.assign(**{'Code.région': df['Code.région'].astype(str)})
+    gdf = gdf.assign(region_code=gdf['code'].astype(str))
+
+    merged_data = pd.merge(df, gdf[['region_code', 'geometry']],
+                           left_on='Code.région', right_on='region_code', how='left')
+
+    merged_data = gpd.GeoDataFrame(merged_data, geometry='geometry')
+
+    fig = go.Figure()
+
+    colors = px.colors.qualitative.Plotly
+    classes = df['classe'].unique()
+
+    offset = 0.02
+
+    for i, classe in enumerate(classes):
+        classe_data = merged_data[merged_data['classe'] == classe]
+
+        x = classe_data['geometry'].centroid.x.tolist()
+        y = classe_data['geometry'].centroid.y.tolist()
+        dz = classe_data['faits'].tolist()
+
+        x_offset = [xi + (i * offset) for xi in x]
+        y_offset = [yi + (i * offset) for yi in y]
+
+        for j in range(len(x)):
+
+            name = classe if j == 0 else None
+            fig.add_trace(go.Scatter3d(
+                x=[x_offset[j], x_offset[j], x_offset[j]],
+                y=[y_offset[j], y_offset[j], y_offset[j]],
+                z=[0, dz[j], 0],
+                mode='lines',
+                line=dict(color=colors[i % len(colors)], width=6),
+                name=name,
+                showlegend=name is not None,
+                hoverinfo='text',
+                hovertext=classe
+            ))
+
+    for _, region in gdf.iterrows():
+        geometry = region['geometry']
+
+        if geometry.geom_type == 'Polygon':
+            polygons = [geometry]
+        elif geometry.geom_type == 'MultiPolygon':
+            polygons = geometry.geoms
+
+        for polygon in polygons:
+            x, y = polygon.exterior.xy
+            fig.add_trace(go.Scatter3d(
+                x=list(x),
+                y=list(y),
+                z=[0]*len(x),
+                mode='lines',
+                line=dict(color='black', width=2),
+                showlegend=False
+            ))
+
+    fig.update_layout(
+        scene=dict(
+            xaxis_title='Longitude',
+            yaxis_title='Latitude',
+            zaxis_title='Nombre de faits',
+            xaxis=dict(showgrid=False),
+            yaxis=dict(showgrid=False),
+        ),
+        margin=dict(r=0, t=0, l=0, b=0),
+        showlegend=True
+    )
+    return fig
+
+
+def bar_heights(fig):
+    # facts drawn for every classe: the bars are the traces with a hovertext, their segments go
+    # from 0 to the height and back (or to NaN); the bars of the rows without geometry are not
+    # drawn by the browser and not counted
+    heights = {}
+    for trace in fig.data:
+        if trace.hovertext is None:
+            continue
+        x = np.asarray(trace.x, dtype=float)
+        z = np.asarray(trace.z, dtype=float)
+        heights[trace.hovertext] = heights.get(trace.hovertext, 0.0) + np.nansum(np.where(np.isnan(x), 0, z))
+    return heights
+
+
+def measure(name, build, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build()
+        timings.append(time.perf_counter() - start)
+    return {
+        'version': name,
+        'traces': len(fig.data),
+        'build_seconds': min(timings),
+        'json_bytes': len(fig.to_json()),
+    }, fig
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the 3D bar map builder')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    df = read_regional_data(os.path.join(PROJECT_DIR, 'data_regional.csv'), sidecar=False)
+    geojson_path = os.path.join(PROJECT_DIR, 'regions.geojson')
+    gdf = gpd.read_file(geojson_path)
+    store = read_geometry_store(geojson_path, sidecar=False)
+
+    baseline, baseline_fig = measure('baseline', lambda: baseline_3d_barchart(df, gdf), args.repeat)
+    # the cube is built once when the data is loaded in the app, it is measured on its own
+    start = time.perf_counter()
+    cube = FactCube.from_frame(df)
+    cube_seconds = time.perf_counter() - start
+    current, current_fig = measure('build_3d_barchart_figure', lambda: build_3d_barchart_figure(cube, store),
+                                   args.repeat)
+    results = [baseline, current]
+    for result in results:
+        print(f"{result['version']:<26} {result['traces']:>6} traces "
+              f"{result['build_seconds'] * 1000:>9.1f} ms {result['json_bytes'] / 1024:>9.1f} KB")
+    print(f"{'FactCube.from_frame':<26} {'':>13} {cube_seconds * 1000:>9.1f} ms")
+
+    expected = bar_heights(baseline_fig)
+    heights = bar_heights(current_fig)
+    same = expected.keys() == heights.keys() and all(np.isclose(expected[key], heights[key]) for key in expected)
+    print('same facts per classe as the baseline' if same else 'DIFFERENT FACTS PER CLASSE')
+    results.append({'version': 'check', 'same_facts_per_classe': bool(same), 'cube_seconds': cube_seconds})
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+# Compares the joins of facts to regions done by plot_mapbox, plot_3d_barchart_map and
+# map_taux_crim before the region index (pandas merges on the stringified codes, centroid per
+# merged row) with the builders of figures.py used by the app, on a cube built once like in the
+# app. The values drawn by each builder are checked against the ones of the merge.
+# Run from anywhere with: python projet/benchmarks/bench_region_join.py
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from cube import FactCube
+from data_store import read_regional_data
+from figures import build_3d_barchart_figure, build_crime_rate_map, build_mapbox_figure
+from geometry_store import read_geometry_store
+
+warnings.filterwarnings('ignore', message='.*geographic CRS.*')
+
+
+def scale_rows(df, factor):
+    # synthetic file `factor` times larger: the same regions, with new years
+    years = df['annee'].max() - df['annee'].min() + 1
+    return pd.concat([df.assign(annee=df['annee'] + k * years) for k in range(factor)], ignore_index=True)
+
+
+# joins as they were done before the region index, returning the values they drew
+
+def merge_mapbox(df, gdf, classe):
+    # facts of every region for the classe
+    filtered_data = df[df['classe'] == classe]
+    regions = gdf.assign(region_code=gdf['code'].astype(str))
+    merged = pd.merge(filtered_data, regions[['region_code', 'geometry']],
+                      left_on='Code.région', right_on='region_code', how='left')
+    gpd.GeoDataFrame(merged, geometry='geometry').__geo_interface__
+    return merged.groupby('region_code')['faits'].sum()
+
+
+def merge_3d_barchart(df, gdf):
+    # total height of the bars of every classe
+    regions = gdf.assign(region_code=gdf['code'].astype(str))
+    merged = gpd.GeoDataFrame(pd.merge(df, regions[['region_code', 'geometry']],
+                                       left_on='Code.région', right_on='region_code', how='left'),
+                              geometry='geometry')
+    heights = {}
+    for classe in df['classe'].unique():
+        rows = merged[(merged['classe'] == classe) & merged['region_code'].notna()]
+        rows['geometry'].centroid
+        heights[classe] = rows['faits'].sum()
+    return heights
+
+
+def merge_taux_crim(df, gdf, classe, year):
+    # crime rate (%) of every region for the classe and the year
+    df = df.assign(pourcentage_criminalite=df['faits'] / df['POP'] * 100)
+    merged = gdf.merge(df, left_on='code', right_on='Code.région', how='left')
+    merged.geometry.centroid
+    rows = merged[(merged['classe'] == classe) & (merged['annee'] == year)]
+    groups = rows.groupby('code')
+    return groups['faits'].sum() / groups['POP'].max() * 100
+
+
+# values drawn by the builders of figures.py
+
+def mapbox_values(fig):
+    trace = fig.data[0]
+    values = pd.Series(trace.customdata, index=trace.locations, dtype=float)
+    return values.dropna()
+
+
+def barchart_heights(fig):
+    # the bars are (0, height, NaN) segments, one trace per classe
+    return {trace.name: np.nansum(trace.z) for trace in fig.data if trace.name is not None}
+
+
+def crime_rate_values(fig, store):
+    # the markers are named after the regions
+    trace = fig.data[0]
+    codes = dict(zip(store.names, store.codes))
+    return pd.Series(trace.marker.color, index=[codes[name] for name in trace.hovertext])
+
+
+def same_values(expected, values):
+    expected = pd.Series(expected, dtype=float)
+    values = pd.Series(values, dtype=float)
+    return set(expected.index) == set(values.index) and np.allclose(values[expected.index], expected, rtol=1e-6)
+
+
+def measure(name, function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'function': name, 'seconds': seconds, 'peak_bytes': peak}, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the joins between facts and regions')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--json', help='write the results to this file')
+    # the previous plot_mapbox serializes the full polygons once per fact row, about 0.5 MB per
+    # row, so it is skipped on the large synthetic files
+    parser.add_argument('--max-geojson-rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    base = read_regional_data(os.path.join(PROJECT_DIR, 'data_regional.csv'), sidecar=False)
+    geojson_path = os.path.join(PROJECT_DIR, 'regions.geojson')
+    gdf = gpd.read_file(geojson_path)
+    store = read_geometry_store(geojson_path, sidecar=False)
+    # the store geojson is built once per process in the app, it is not part of the measure
+    store.geojson('medium')
+    classe = base['classe'].iloc[0]
+    year = int(base['annee'].iloc[0])
+    # the first figures of a process load the validators of plotly, not part of the measure
+    warm_cube = FactCube.from_frame(base)
+    build_mapbox_figure(warm_cube, store, classe)
+    build_3d_barchart_figure(warm_cube, store)
+    build_crime_rate_map(warm_cube, store, classe, year)
+
+    results = []
+    for scale in args.scales:
+        df = scale_rows(base, scale)
+        # the cube is built once when the data is loaded in the app, measured on its own
+        cube_run, cube = measure('FactCube.from_frame', FactCube.from_frame, df)
+        runs = [cube_run]
+        checks = []
+        if (df['classe'] == classe).sum() <= args.max_geojson_rows:
+            run, expected = measure('plot_mapbox (merge)', merge_mapbox, df, gdf, classe)
+            runs.append(run)
+        else:
+            expected = None
+        run, fig = measure('plot_mapbox (build_mapbox_figure)', build_mapbox_figure, cube, store, classe)
+        runs.append(run)
+        if expected is not None:
+            checks.append(('plot_mapbox', same_values(expected, mapbox_values(fig))))
+
+        run, expected = measure('plot_3d_barchart_map (merge)', merge_3d_barchart, df, gdf)
+        runs.append(run)
+        run, fig = measure('plot_3d_barchart_map (build_3d_barchart_figure)', build_3d_barchart_figure, cube, store)
+        runs.append(run)
+        checks.append(('plot_3d_barchart_map', same_values(expected, barchart_heights(fig))))
+
+        run, expected = measure('map_taux_crim (merge)', merge_taux_crim, df, gdf, classe, year)
+        runs.append(run)
+        run, fig = measure('map_taux_crim (build_crime_rate_map)', build_crime_rate_map, cube, store, classe, year)
+        runs.append(run)
+        checks.append(('map_taux_crim', same_values(expected, crime_rate_values(fig, store))))
+
+        for run in runs:
+            run.update(scale=scale, rows=len(df))
+            print(f"x{scale:<4} {run['function']:<50} {run['seconds'] * 1000:>10.1f} ms "
+                  f"{run['peak_bytes'] / 1024 ** 2:>10.1f} MB")
+        for chart, same in checks:
+            print(f"x{scale:<4} {chart:<50} {'same values as the merge' if same else 'DIFFERENT VALUES'}")
+            results.append({'function': chart, 'scale': scale, 'same_values': same})
+        results.extend(runs)
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
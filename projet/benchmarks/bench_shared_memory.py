@@ -0,0 +1,93 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import pandas as pd
+# imported before the processes are forked so that only the data is measured
+import pyarrow.feather  # noqa: F401
+
+# Memory of N processes holding the fact table at the same time (like N server processes or the
+# workers of warm_figures.py), when each one parses the csv (private copies) and when they map the
+# Arrow sidecar (one copy in the page cache shared by all of them). Read from /proc/self/smaps_rollup,
+# so Linux only: Pss counts the shared pages once across the processes, Private the pages of each.
+#
+#   python projet/benchmarks/bench_shared_memory.py --scale 100 --processes 1 2 4 8
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from data_store import file_signature, read_regional_data, write_sidecar
+
+
+def memory():
+    # kB fields of smaps_rollup, in bytes
+    fields = {}
+    with open('/proc/self/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return fields
+
+
+def _hold(path, sidecar, barrier):
+    before = memory()
+    df = read_regional_data(path, sidecar=sidecar)
+    # touches every value, like the charts and the table explorer do, column by column (a
+    # select_dtypes would consolidate the columns into a private copy)
+    for column in df:
+        values = df[column].cat.codes if df[column].dtype == 'category' else df[column]
+        values.to_numpy().sum()
+    # every process holds the data when the memory is read
+    barrier.wait()
+    after = memory()
+    barrier.wait()
+    return {key: after[key] - before[key] for key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty')}
+
+
+def run(path, sidecar, processes):
+    context = multiprocessing.get_context('fork')
+    barrier = context.Manager().Barrier(processes)
+    with context.Pool(processes) as pool:
+        results = pool.starmap(_hold, [(path, sidecar, barrier)] * processes)
+    return {key: sum(result[key] for result in results) for key in results[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory of several processes sharing the fact table')
+    parser.add_argument('--scale', type=int, default=100, help='copies of data_regional.csv in the file')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit('this benchmark reads /proc/self/smaps_rollup (Linux only)')
+
+    base = read_regional_data(os.path.join(PROJECT_DIR, 'data_regional.csv'), sidecar=False)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'data_x{args.scale}.csv')
+        df = pd.concat([base] * args.scale, ignore_index=True)
+        df.to_csv(path, sep=';', decimal=',', index=False)
+        write_sidecar(df, path, file_signature(path))
+        del df
+        print(f'x{args.scale} ({len(base) * args.scale:,} rows)')
+        print(f"{'':<10}{'processes':>10}{'Rss MB':>10}{'Pss MB':>10}{'Private MB':>12}")
+        for sidecar, mode in ((False, 'csv'), (True, 'arrow')):
+            for processes in args.processes:
+                total = run(path, sidecar, processes)
+                private = total['Private_Clean'] + total['Private_Dirty']
+                print(f"{mode:<10}{processes:>10}{total['Rss'] / 1024 ** 2:>10.1f}"
+                      f"{total['Pss'] / 1024 ** 2:>10.1f}{private / 1024 ** 2:>12.1f}", flush=True)
+                results.append({'mode': mode, 'scale': args.scale, 'processes': processes,
+                                'rss': total['Rss'], 'pss': total['Pss'], 'private': private})
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
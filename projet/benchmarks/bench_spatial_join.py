@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+import numpy as np
+import shapely
+
+# Throughput of the spatial join of spatial_join.py on random points drawn in the bounding box of
+# the regions (about half of them fall in a region), checked against geopandas.sjoin on a sample:
+#
+#   python projet/benchmarks/bench_spatial_join.py --points 10000000
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import geopandas as gpd
+
+from data_store import peak_rss
+from geometry_store import read_geometry_store
+from spatial_join import BATCH_SIZE, RegionAssigner
+
+warnings.filterwarnings('ignore')
+
+
+def random_points(store, count, seed=0):
+    xmin, ymin, xmax, ymax = shapely.total_bounds(np.asarray(store.geometry('full').values))
+    rng = np.random.default_rng(seed)
+    return rng.uniform(xmin, xmax, count), rng.uniform(ymin, ymax, count)
+
+
+def check(store, positions, longitude, latitude, count):
+    # share of the first `count` points assigned to the same region as geopandas.sjoin
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(longitude[:count], latitude[:count]), crs=store.crs)
+    joined = gpd.sjoin(points, store.frame(), predicate='intersects', how='left')
+    joined = joined[~joined.index.duplicated()]
+    expected = store.positions(joined['code'].fillna(''))
+    return float((expected == positions[:count]).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the assignment of points to the regions')
+    parser.add_argument('--points', type=int, default=10_000_000)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--check', type=int, default=20_000, help='points compared with geopandas.sjoin')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    store = read_geometry_store(os.path.join(PROJECT_DIR, 'regions.geojson'))
+    longitude, latitude = random_points(store, args.points)
+
+    start = time.perf_counter()
+    assigner = RegionAssigner(store)
+    index_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    positions = assigner.positions(longitude, latitude, args.batch_size)
+    seconds = time.perf_counter() - start
+
+    result = {
+        'points': args.points,
+        'batch_size': args.batch_size,
+        'index_seconds': round(index_seconds, 4),
+        'seconds': round(seconds, 4),
+        'points_per_second': round(args.points / seconds),
+        'inside': float((positions >= 0).mean()),
+        'agreement_with_sjoin': check(store, positions, longitude, latitude, min(args.check, args.points)),
+        'peak_rss': peak_rss(),
+    }
+    print(f"{args.points:,} points in {seconds:.1f} s ({result['points_per_second']:,} points/s), "
+          f"index built in {index_seconds * 1000:.0f} ms, {result['inside']:.1%} inside a region, "
+          f"{result['agreement_with_sjoin']:.2%} agreement with geopandas.sjoin")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(result, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Cold start of the portfolio: each page module is imported in a new interpreter with
+# `python -X importtime` and the report gives the import time of the page, the heaviest modules
+# it loads and which of the big libraries it pulls in. Compared with the report of another commit,
+# it tells which page got slower to open:
+#
+#   python projet/benchmarks/bench_startup.py --output startup.json
+#   python projet/benchmarks/bench_startup.py --compare startup.json
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPOSITORY_DIR = os.path.dirname(PROJECT_DIR)
+
+# page -> module imported for it (the app is run from the root of the repository)
+PAGES = {
+    'Biographie': 'myProfile',
+    'Visualisation': 'DataVIz',
+}
+HEAVY_LIBRARIES = ('pandas', 'numpy', 'matplotlib', 'geopandas', 'shapely', 'pyogrio', 'plotly',
+                   'pydeck', 'pyarrow', 'wordcloud', 'PIL', 'seaborn', 'folium')
+
+
+def import_times(module):
+    # {module: (self µs, cumulative µs, depth)} of every module imported by `import module`
+    # in a fresh interpreter, in import order
+    code = f'import sys; sys.path.insert(0, {PROJECT_DIR!r}); import {module}'
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=REPOSITORY_DIR,
+                               capture_output=True, text=True, check=True)
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        times[name.strip()] = (int(own), int(cumulative), depth)
+    return times
+
+
+def measure_page(module, repeat, top):
+    # best of `repeat` cold imports, the disk cache of the first run is not counted
+    runs = [import_times(module) for _ in range(repeat)]
+    totals = [sum(cumulative for own, cumulative, depth in times.values() if depth == 0) for times in runs]
+    best = runs[totals.index(min(totals))]
+    heaviest = sorted(((name, cumulative) for name, (own, cumulative, depth) in best.items() if depth <= 1),
+                      key=lambda item: -item[1])[:top]
+    return {
+        'seconds': round(min(totals) / 1e6, 4),
+        'modules': len(best),
+        'libraries': [library for library in HEAVY_LIBRARIES if library in best],
+        'heaviest': [{'module': name, 'seconds': round(cumulative / 1e6, 4)} for name, cumulative in heaviest],
+    }
+
+
+def compare(results, baseline_path, threshold):
+    # pages slower than the baseline by more than `threshold` (a ratio), and new heavy libraries
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)['pages']
+
+    regressions = []
+    for page, row in results.items():
+        before = baseline.get(page)
+        if before is None:
+            continue
+        if row['seconds'] > before['seconds'] * threshold:
+            regressions.append(f"{page}: {before['seconds']} s -> {row['seconds']} s")
+        for library in sorted(set(row['libraries']) - set(before['libraries'])):
+            regressions.append(f"{page}: now imports {library}")
+
+    for regression in regressions:
+        print('REGRESSION', regression)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of every page of the portfolio')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help='number of heaviest modules reported per page')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', help='JSON report of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='ratio above which a page is reported as a regression')
+    args = parser.parse_args()
+
+    results = {}
+    for page, module in PAGES.items():
+        results[page] = measure_page(module, args.repeat, args.top)
+        row = results[page]
+        print(f"{page:<14} {row['seconds'] * 1000:>8.0f} ms {row['modules']:>5} modules  "
+              f"{', '.join(row['libraries'])}")
+        for heavy in row['heaviest']:
+            print(f"{'':<14} {heavy['seconds'] * 1000:>8.0f} ms {heavy['module']}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'python': sys.version.split()[0], 'pages': results}, output, indent=2)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import sys
+import pandas as pd
+
+# Memory of the fact table per column (df.memory_usage(deep=True)) as it was first loaded
+# (pd.read_csv with default types, the comma decimals left as strings) and with the compact types
+# of data_store.DTYPES, on the shipped file and on the file repeated `scale` times. The cube the
+# charts are built from is reported too, it does not grow with the rows.
+#
+#   python projet/benchmarks/memory_report.py --scales 1 100
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from cube import FactCube
+from data_store import read_regional_data
+
+DATA_PATH = os.path.join(PROJECT_DIR, 'data_regional.csv')
+
+
+def read_original(filepath):
+    # the first version of load_data
+    return pd.read_csv(filepath, delimiter=';')
+
+
+def repeat(df, scale):
+    return pd.concat([df] * scale, ignore_index=True) if scale > 1 else df
+
+
+def report(original, compact):
+    before = original.memory_usage(deep=True)
+    after = compact.memory_usage(deep=True)
+    table = pd.DataFrame({
+        'dtype_before': original.dtypes.astype(str),
+        'dtype_after': compact.dtypes.astype(str),
+        'bytes_before': before,
+        'bytes_after': after,
+    })
+    table.loc['total', ['bytes_before', 'bytes_after']] = [before.sum(), after.sum()]
+    table['ratio'] = (table['bytes_before'] / table['bytes_after']).round(1)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory of the fact table before and after the compact types')
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    original = read_original(args.data)
+    compact = read_regional_data(args.data, sidecar=False)
+    cube = FactCube.from_frame(compact)
+    cube_bytes = cube.values.nbytes + cube.counts.nbytes
+
+    results = []
+    for scale in args.scales:
+        table = report(repeat(original, scale), repeat(compact, scale))
+        print(f'x{scale} ({len(original) * scale:,} rows)')
+        print(table.to_string(float_format=lambda value: f'{value:,.0f}'))
+        print(f'cube: {cube_bytes:,} bytes\n')
+        results.append({
+            'scale': scale,
+            'rows': len(original) * scale,
+            'columns': table.drop(index='total').reset_index(names='column').to_dict('records'),
+            'bytes_before': int(table.loc['total', 'bytes_before']),
+            'bytes_after': int(table.loc['total', 'bytes_after']),
+            'cube_bytes': int(cube_bytes),
+        })
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(results, output, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+# Headless benchmarks of the loaders and of every chart of the Visualisation page.
+# The chart functions run with the streamlit module of functions.py replaced by a stub that
+# answers the widgets with their first option and records the figures sent to st.plotly_chart.
+# Every measure is done on the shipped files and on synthetic files where the rows and the
+# regions are multiplied by each scale, and the results are written as a JSON report that can be
+# compared with the report of another commit:
+#
+#   python projet/benchmarks/run_benchmarks.py --output bench.json
+#   python projet/benchmarks/run_benchmarks.py --scales 1 10 --compare bench.json
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import geopandas as gpd
+import pandas as pd
+
+import functions
+from cube import FactCube
+from data_store import read_regional_data
+from geometry_store import read_geometry_store
+
+warnings.filterwarnings('ignore')
+
+DATA_PATH = os.path.join(PROJECT_DIR, 'data_regional.csv')
+GEOJSON_PATH = os.path.join(PROJECT_DIR, 'regions.geojson')
+
+
+class HeadlessStreamlit:
+    # Stand-in for the streamlit module: widgets return their first option (or the value given
+    # in `choices`, keyed by label), figures passed to plotly_chart are kept in self.figures and
+    # every other call does nothing.
+
+    def __init__(self, choices=None):
+        self.choices = choices or {}
+        self.figures = []
+
+    def plotly_chart(self, figure, *args, **kwargs):
+        self.figures.append(figure)
+
+    def selectbox(self, label, options, *args, **kwargs):
+        return self.choices.get(label, list(options)[0])
+
+    def radio(self, label, options, *args, **kwargs):
+        return self.choices.get(label, list(options)[0])
+
+    def select_slider(self, label, options=(), value=None, *args, **kwargs):
+        return self.choices.get(label, value if value is not None else list(options)[0])
+
+    def checkbox(self, label, value=False, *args, **kwargs):
+        return self.choices.get(label, value)
+
+    def multiselect(self, label, options, default=None, *args, **kwargs):
+        return self.choices.get(label, list(default or []))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+
+def synthetic_files(scale, directory):
+    # data and regions multiplied by `scale`: every region is copied `scale` times under new codes
+    # (same polygons, simplified to keep the files small) with a copy of all its rows
+    if scale == 1:
+        return DATA_PATH, GEOJSON_PATH
+
+    df = read_regional_data(DATA_PATH, sidecar=False)
+    df = pd.concat([df.assign(**{'Code.région': df['Code.région'].astype(str) + f'-{copy}'}) for copy in range(scale)],
+                   ignore_index=True)
+    data_path = os.path.join(directory, f'data_x{scale}.csv')
+    df.to_csv(data_path, sep=';', decimal=',', index=False)
+
+    gdf = read_geometry_store(GEOJSON_PATH).frame('low')
+    gdf = pd.concat([gdf.assign(code=gdf['code'] + f'-{copy}') for copy in range(scale)], ignore_index=True)
+    geojson_path = os.path.join(directory, f'regions_x{scale}.geojson')
+    gpd.GeoDataFrame(gdf, crs='EPSG:4326').to_file(geojson_path, driver='GeoJSON')
+    return data_path, geojson_path
+
+
+def chart_benchmarks(cube, store):
+    # name -> (function, arguments, widget choices)
+    return {
+        'plot_pie_chart': (functions.plot_pie_chart, (cube,), {}),
+        'plot_mapbox': (functions.plot_mapbox, (cube, store), {}),
+        'plot_3d_barchart_map': (functions.plot_3d_barchart_map, (cube, store), {}),
+        'courbes_vict_mec': (functions.courbes_vict_mec, (cube,), {}),
+        'map_taux_crim': (functions.map_taux_crim, (cube, store), {}),
+        'dynamic_plot': (functions.dynamic_plot, (cube,), {}),
+        'ensemble_viz_faits_region[Scatter]': (functions.ensemble_viz_faits_region, (cube,),
+                                               {'Select the visualization :': 'Scatter'}),
+        'ensemble_viz_faits_region[Bar]': (functions.ensemble_viz_faits_region, (cube,),
+                                           {'Select the visualization :': 'Bar'}),
+    }
+
+
+def run_chart(function, args, choices, cube, store):
+    # the figure cache and the memoized rates/geojson are emptied so the build is measured cold,
+    # and the figures written by the warm-up job are not read
+    cache = functions.get_figure_cache()
+    cache.clear()
+    cache.directory = None
+    cube._memo.clear()
+    store._geojson.clear()
+    stub = HeadlessStreamlit(choices)
+    real_st, functions.st = functions.st, stub
+    try:
+        function(*args)
+    finally:
+        functions.st = real_st
+    return stub.figures
+
+
+def measure(run):
+    # wall time without tracing, then peak traced memory on a second run
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, {'seconds': round(seconds, 4), 'peak_bytes': peak}
+
+
+def run_scale(scale, directory, only=None):
+    data_path, geojson_path = synthetic_files(scale, directory)
+    results = []
+
+    def record(name, run, describe):
+        if only and name not in only:
+            return None
+        value, metrics = measure(run)
+        results.append({'name': name, 'scale': scale, **describe(value), **metrics})
+        print(f"x{scale:<5} {name:<36} {metrics['seconds'] * 1000:>10.1f} ms "
+              f"{metrics['peak_bytes'] / 1024 ** 2:>9.1f} MB", flush=True)
+        return value
+
+    df = read_regional_data(data_path, sidecar=False)
+    record('load_data', lambda: read_regional_data(data_path, sidecar=False), lambda df: {'rows': len(df)})
+    record('load_geojson', lambda: read_geometry_store(geojson_path, sidecar=False), lambda store: {'regions': len(store)})
+    record('load_cube', lambda: FactCube.from_frame(df), lambda cube: {'cells': int(cube.counts.size)})
+
+    cube = FactCube.from_frame(df, version=('x', scale))
+    store = read_geometry_store(geojson_path, version=('x', scale), sidecar=False)
+    for name, (function, args, choices) in chart_benchmarks(cube, store).items():
+        record(name, lambda: run_chart(function, args, choices, cube, store),
+               lambda figures: {
+                   'figures': len(figures),
+                   'traces': sum(len(figure.data) for figure in figures),
+                   'figure_bytes': sum(len(figure.to_json()) for figure in figures),
+               })
+    return results
+
+
+def warm_up():
+    # plotly and pandas load a lot of code on their first call, which is not what is measured
+    cube = FactCube.from_frame(read_regional_data(DATA_PATH, sidecar=False))
+    store = read_geometry_store(GEOJSON_PATH)
+    for function, args, choices in chart_benchmarks(cube, store).values():
+        run_chart(function, args, choices, cube, store)[0].to_json()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    # prints the measures slower or bigger than the baseline by more than `threshold` (a ratio)
+    with open(baseline_path) as baseline_file:
+        baseline = {(row['name'], row['scale']): row for row in json.load(baseline_file)['results']}
+
+    regressions = []
+    for row in results:
+        before = baseline.get((row['name'], row['scale']))
+        if before is None:
+            continue
+        for metric in ('seconds', 'peak_bytes', 'traces', 'figure_bytes'):
+            if before.get(metric) and row.get(metric) and row[metric] > before[metric] * threshold:
+                regressions.append(f"x{row['scale']} {row['name']}: {metric} {before[metric]} -> {row[metric]}")
+
+    for regression in regressions:
+        print('REGRESSION', regression)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless benchmarks of the loaders and chart builders')
+    # x1000 (13,000 regions, 2.3 million rows) takes a long time with the animated charts,
+    # add it explicitly with --scales 1 10 100 1000
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--only', nargs='+', help='names of the benchmarks to run')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', help='JSON report of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='ratio above which a measure is reported as a regression')
+    args = parser.parse_args()
+
+    warm_up()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            results.extend(run_scale(scale, directory, args.only))
+
+    report = {
+        'commit': git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
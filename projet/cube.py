@@ -0,0 +1,250 @@
+import time
+import numpy as np
+import pandas as pd
+from data_store import peak_rss, read_csv_chunks
+
+# Pre-aggregated cube of the fact table, built once at load time.
+# The cells are indexed by (indicator, annee, Code.région) where an indicator is a
+# (classe, unité.de.compte) pair, so a chart only slices the arrays it needs instead of
+# filtering and grouping the whole frame on every rerun.
+
+MEASURES = ('faits', 'POP', 'LOG')
+KEYS = ('classe', 'unité.de.compte', 'annee', 'Code.région')
+RATE_DIMENSIONS = ('classe', 'annee', 'Code.région')
+
+
+def aggregate_facts(df):
+    # sums of the measures and number of rows for every key of the cube, in a long frame.
+    # The sums are kept in 64 bits whatever the compact types of the data.
+    groups = df.groupby(list(KEYS), observed=True, sort=False)
+    grouped = groups[list(MEASURES)].sum().astype({'faits': 'int64', 'POP': 'int64', 'LOG': 'float64'})
+    grouped['rows'] = groups.size()
+    return grouped.reset_index()
+
+
+def combine_aggregates(left, right):
+    # merges two outputs of aggregate_facts. The categorical keys are merged as strings, their
+    # categories can differ from one chunk to the other
+    combined = pd.concat([left, right], ignore_index=True)
+    for key in ('classe', 'unité.de.compte', 'Code.région'):
+        combined[key] = combined[key].astype(str)
+    return combined.groupby(list(KEYS), sort=False)[list(MEASURES) + ['rows']].sum().reset_index()
+
+
+def stream_cube(filepath, chunksize=500_000, progress=None, version=None):
+    # Builds the cube from a csv read by chunks: every chunk is aggregated and folded into the
+    # running aggregates, so the memory used depends on the chunk size and the number of keys,
+    # not on the size of the file. The ingestion statistics are kept in cube.ingestion.
+    start = time.perf_counter()
+    grouped = None
+    rows = 0
+    for chunk in read_csv_chunks(filepath, chunksize, progress):
+        rows += len(chunk)
+        part = aggregate_facts(chunk)
+        grouped = part if grouped is None else combine_aggregates(grouped, part)
+
+    cube = FactCube(grouped, version=version)
+    seconds = time.perf_counter() - start
+    cube.ingestion = {
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else None,
+        'peak_rss': peak_rss(),
+    }
+    return cube
+
+
+class FactCube:
+
+    def __init__(self, grouped, version=None):
+        # grouped is the output of aggregate_facts (one row per key)
+        self.version = version
+        self.ingestion = None
+        # hash of every year when the cube comes from the partition store
+        self.year_versions = None
+        self._memo = {}
+        indicators = grouped[['classe', 'unité.de.compte']].astype(str)
+        indicator_codes, indicator_values = pd.factorize(pd.MultiIndex.from_frame(indicators))
+        year_codes, self.years = pd.factorize(grouped['annee'], sort=True)
+        region_codes, self.regions = pd.factorize(grouped['Code.région'].astype(str), sort=True)
+
+        self.classes = indicator_values.get_level_values(0).to_numpy()
+        self.units = indicator_values.get_level_values(1).to_numpy()
+        self.years = np.asarray(self.years)
+        self.regions = np.asarray(self.regions)
+
+        shape = (len(self.classes), len(self.years), len(self.regions))
+        self.values = np.zeros(shape + (len(MEASURES),))
+        self.counts = np.zeros(shape, dtype=np.int64)
+        cells = (indicator_codes, year_codes, region_codes)
+        self.values[cells] = grouped[list(MEASURES)].to_numpy(dtype=float)
+        self.counts[cells] = grouped['rows'].to_numpy()
+
+    @classmethod
+    def from_frame(cls, df, version=None):
+        return cls(aggregate_facts(df), version=version)
+
+    def version_for(self, years):
+        # version of the data of some years only, for the figures that only depend on them
+        if self.year_versions is None:
+            return self.version
+        return tuple(self.year_versions.get(int(year)) for year in years)
+
+    def coordinates(self, dimension):
+        # distinct values of a dimension, classes in their order of appearance, years and regions sorted
+        if dimension == 'classe':
+            return pd.unique(self.classes)
+        if dimension == 'unité.de.compte':
+            return pd.unique(self.units)
+        if dimension == 'annee':
+            return self.years
+        if dimension == 'Code.région':
+            return self.regions
+        raise KeyError(dimension)
+
+    def query(self, measure='faits', by=('Code.région',), where=None, agg='sum', keep_empty=False):
+        # slice of the cube filtered by `where` ({dimension: value or list of values}) and rolled up
+        # on the dimensions of `by`, returned as a Series indexed by `by`.
+        # agg='mean' averages over the rows of the original frame instead of summing.
+        where = where or {}
+        by = list(by)
+        unknown = set(by) | set(where)
+        if not unknown <= set(KEYS):
+            raise KeyError(sorted(unknown - set(KEYS)))
+
+        indicators = self._select_indicators(where)
+        years = self._select(self.years, where.get('annee'))
+        regions = self._select(self.regions, where.get('Code.région'))
+
+        cells = np.ix_(indicators, years, regions)
+        values = self.values[..., MEASURES.index(measure)][cells]
+        counts = self.counts[cells]
+
+        # the year and region axes are rolled up in NumPy, the indicator axis is rolled up
+        # below since several indicators can share a classe or a unit
+        axes = tuple(axis for axis, dimension in ((1, 'annee'), (2, 'Code.région')) if dimension not in by)
+        values = values.sum(axis=axes, keepdims=True)
+        counts = counts.sum(axis=axes, keepdims=True)
+
+        levels = {
+            'classe': self.classes[indicators],
+            'unité.de.compte': self.units[indicators],
+            'annee': self.years[years] if 'annee' in by else np.array([None]),
+            'Code.région': self.regions[regions] if 'Code.région' in by else np.array([None]),
+        }
+        index = pd.MultiIndex.from_product(
+            [np.arange(len(indicators)), levels['annee'], levels['Code.région']],
+            names=['indicator', 'annee', 'Code.région'])
+        result = pd.DataFrame({'value': values.ravel(), 'rows': counts.ravel()}, index=index).reset_index()
+        result['classe'] = levels['classe'][result['indicator']]
+        result['unité.de.compte'] = levels['unité.de.compte'][result['indicator']]
+
+        if by:
+            result = result.groupby(by, sort=False)[['value', 'rows']].sum()
+        else:
+            result = result[['value', 'rows']].sum().to_frame().T
+        if not keep_empty:
+            result = result[result['rows'] > 0]
+
+        series = result['value'] / result['rows'] if agg == 'mean' else result['value']
+        return series.rename(measure)
+
+    def matrix(self, measure='faits', where=None, agg='sum'):
+        # dense (annee x Code.région) array of a measure over the indicators selected by `where`,
+        # NaN where there is no row. It is kept on the cube, so the charts animated over the
+        # years share it instead of grouping the data again.
+        where = where or {}
+        key = ('matrix', measure, tuple(sorted((k, tuple(np.atleast_1d(v))) for k, v in where.items())), agg)
+        if key not in self._memo:
+            indicators = self._select_indicators(where)
+            values = self.values[indicators, :, :, MEASURES.index(measure)].sum(axis=0)
+            counts = self.counts[indicators].sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                matrix = values / counts if agg == 'mean' else values
+            self._memo[key] = np.where(counts > 0, matrix, np.nan)
+        return self._memo[key]
+
+    def denominator(self, measure='POP'):
+        # (annee, Code.région) array of a population measure: every indicator repeats the
+        # population of its region and year, so it is read from the cells and not summed
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cells = self.values[..., MEASURES.index(measure)] / self.counts
+        cells[self.counts == 0] = np.nan
+        if np.isnan(cells).all():
+            return np.full(cells.shape[1:], np.nan)
+        return np.nanmax(cells, axis=0)
+
+    def rates(self, by=RATE_DIMENSIONS, where=None, denominator='POP', per=1000, regions=None):
+        # Rates of facts per `per` inhabitants (denominator='POP') or dwellings ('LOG'), computed
+        # over every group of `by` in one pass on the arrays of the cube. Returns the coordinates
+        # of `by` as a dict and the array of rates, with the dimensions in the order of
+        # RATE_DIMENSIONS. `regions` (e.g. the codes of a geometry store) sets the order of the
+        # region axis, NaN for the regions absent from the data. The cube itself is never modified
+        # and the results are kept, so the rates of every classe and year are computed once.
+        where = where or {}
+        by = tuple(dimension for dimension in RATE_DIMENSIONS if dimension in by)
+        key = (by, tuple(sorted((k, tuple(np.atleast_1d(v))) for k, v in where.items())),
+               denominator, per, None if regions is None else tuple(regions))
+        if key not in self._memo:
+            self._memo[key] = self._compute_rates(by, where, denominator, per, regions)
+        return self._memo[key]
+
+    def _compute_rates(self, by, where, denominator, per, regions):
+        indicators = self._select_indicators(where)
+        years = self._select(self.years, where.get('annee'))
+        if regions is None:
+            region_positions = self._select(self.regions, where.get('Code.région'))
+            region_codes = self.regions[region_positions]
+        else:
+            region_codes = np.asarray(regions)
+            region_positions = pd.Index(self.regions).get_indexer(region_codes)
+
+        # a missing region is read from an extra column of NaN
+        numerator = self.values[..., MEASURES.index('faits')][np.ix_(indicators, years)]
+        numerator = np.concatenate([numerator, np.full(numerator.shape[:2] + (1,), np.nan)], axis=2)
+        numerator = numerator[:, :, region_positions]
+        population = self.denominator(denominator)[years]
+        population = np.concatenate([population, np.full((len(years), 1), np.nan)], axis=1)
+        population = population[:, region_positions]
+
+        coordinates = {}
+        if 'classe' in by:
+            # indicators sharing a classe are summed with a (classe x indicator) matrix
+            classe_codes, classes = pd.factorize(self.classes[indicators])
+            grouping = np.zeros((len(classes), len(indicators)))
+            grouping[classe_codes, np.arange(len(indicators))] = 1
+            numerator = np.tensordot(grouping, np.nan_to_num(numerator), axes=1)
+            coordinates['classe'] = np.asarray(classes)
+        else:
+            numerator = np.nansum(numerator, axis=0, keepdims=True)
+
+        if 'annee' in by:
+            coordinates['annee'] = self.years[years]
+        else:
+            numerator = numerator.sum(axis=1, keepdims=True)
+            population = population.sum(axis=0, keepdims=True)
+
+        if 'Code.région' in by:
+            coordinates['Code.région'] = region_codes
+        else:
+            numerator = np.nansum(numerator, axis=2, keepdims=True)
+            population = np.nansum(population, axis=1, keepdims=True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rates = numerator / population[np.newaxis] * per
+        rates[~np.isfinite(rates)] = np.nan
+
+        axes = tuple(axis for axis, dimension in enumerate(RATE_DIMENSIONS) if dimension not in by)
+        return coordinates, rates.squeeze(axis=axes)
+
+    def _select_indicators(self, where):
+        mask = np.ones(len(self.classes), dtype=bool)
+        for dimension, coordinates in (('classe', self.classes), ('unité.de.compte', self.units)):
+            if dimension in where:
+                mask &= np.isin(coordinates, np.atleast_1d(where[dimension]))
+        return np.flatnonzero(mask)
+
+    def _select(self, coordinates, values):
+        if values is None:
+            return np.arange(len(coordinates))
+        return np.flatnonzero(np.isin(coordinates, np.atleast_1d(values)))
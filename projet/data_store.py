@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import pandas as pd
+
+# Loading layer for the SSMSI delinquency files (semicolon separated, French decimal commas).
+# Nothing in this module depends on streamlit, the caching across reruns lives in functions.py.
+
+CSV_OPTIONS = dict(sep=';', decimal=',')
+
+# Compact types: the text columns are dictionary encoded (the region codes stay zero-padded
+# strings, "01", "11", in the categories so they match the geojson codes), the integers are
+# downcast to the smallest type holding the national totals and the measures are float32.
+# See benchmarks/memory_report.py for the memory of each column.
+DTYPES = {
+    'classe': 'category',
+    'annee': 'int16',
+    'Code.région': 'category',
+    'unité.de.compte': 'category',
+    'millPOP': 'int16',
+    'millLOG': 'int16',
+    'faits': 'int32',
+    'POP': 'int32',
+    'LOG': 'float32',
+    'tauxpourmille': 'float32',
+}
+
+
+def file_signature(filepath):
+    # mtime and size of the file, used as cache key so an edited file is parsed again
+    stat = os.stat(filepath)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def sidecar_path(filepath):
+    return os.path.splitext(filepath)[0] + '.arrow'
+
+
+def read_csv_typed(filepath):
+    return pd.read_csv(filepath, dtype=DTYPES, **CSV_OPTIONS)
+
+
+def signature_metadata(signature):
+    # schema metadata of a sidecar: the signature of the file it was built from. A sidecar is
+    # only used when the file still has this exact signature, a newer sidecar is not enough
+    # (cp -p, rsync -a or tar keep the older mtime of the file they replace it with)
+    return {b'source_signature': json.dumps(list(signature)).encode()}
+
+
+def matches_signature(metadata, filepath):
+    expected = signature_metadata(file_signature(filepath))
+    return (metadata or {}).get(b'source_signature') == expected[b'source_signature']
+
+
+def read_sidecar(filepath):
+    # Returns the Arrow copy of the csv if it was built from the csv as it is, None otherwise. The
+    # file is memory-mapped and the columns of the frame are read-only views on it (nothing is
+    # copied), so every session and every process reading it shares the same pages of the OS
+    # page cache.
+    path = sidecar_path(filepath)
+    try:
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        if not matches_signature(table.schema.metadata, filepath):
+            return None
+        return table.to_pandas(split_blocks=True)
+    except (OSError, ImportError, ValueError):
+        return None
+
+
+def write_sidecar(df, filepath, signature):
+    # The sidecar is only an accelerator for cold starts, it is skipped when pyarrow is missing
+    # or the folder is read only. It is written uncompressed and in a single record batch so that
+    # it can be mapped without copies, and replaced atomically: the processes that still map the
+    # previous file keep reading it. `signature` is the one of the csv when it was read.
+    path = sidecar_path(filepath)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        import pyarrow as pa
+        from pyarrow import feather
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **signature_metadata(signature)})
+        feather.write_feather(table, temporary, compression='uncompressed', chunksize=max(len(df), 1))
+        os.replace(temporary, path)
+    except (OSError, ImportError):
+        pass
+
+
+def read_regional_data(filepath, sidecar=True):
+    # This function parses the csv once with explicit types, using the Arrow sidecar when possible
+    if sidecar:
+        df = read_sidecar(filepath)
+        if df is not None:
+            # a sidecar written with other types is converted, only the columns that differ (astype
+            # copies the codes of a categorical even when it is already one)
+            changed = {column: dtype for column, dtype in DTYPES.items() if str(df[column].dtype) != dtype}
+            return df.astype(changed) if changed else df
+
+    signature = file_signature(filepath)
+    df = read_csv_typed(filepath)
+    if sidecar:
+        write_sidecar(df, filepath, signature)
+    return df
+
+
+def read_csv_chunks(filepath, chunksize, progress=None):
+    # Yields typed chunks of the csv so that files bigger than the memory can be aggregated,
+    # progress(fraction, rows) is called after every chunk with the share of the file already read
+    total = max(os.path.getsize(filepath), 1)
+    rows = 0
+    with open(filepath, 'rb') as handle:
+        for chunk in pd.read_csv(handle, dtype=DTYPES, chunksize=chunksize, **CSV_OPTIONS):
+            rows += len(chunk)
+            if progress is not None:
+                progress(min(handle.tell() / total, 1.0), rows)
+            yield chunk
+
+
+def peak_rss():
+    # peak resident memory of the process in bytes, None where the resource module is missing
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
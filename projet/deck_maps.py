@@ -0,0 +1,99 @@
+import json
+import numpy as np
+import plotly.express as px
+import pydeck as pdk
+from pydeck.bindings.json_tools import default_serialize
+
+from figures import choropleth_state, crime_rates, region_facts
+
+# Deck.gl versions of the crime map and of the crime rate map, drawn by pydeck (shipped with
+# streamlit, shown with st.pydeck_chart). The polygons and points are drawn by the GPU of the
+# browser, so the maps stay fluid with the communes instead of the regions. The server only
+# computes one color per region, the geometry is the simplified geojson kept by the store.
+
+VIEW = pdk.ViewState(latitude=46.603354, longitude=1.888334, zoom=4.5)
+MAP_STYLE = 'light'
+# above this number of regions the polygons are sent with the coarsest simplification
+DETAILED_REGIONS = 1000
+MISSING_COLOR = [200, 200, 200, 60]
+
+
+class CompactDeck(pdk.Deck):
+    # pydeck indents its JSON, which makes the polygons about four times bigger on the wire;
+    # st.pydeck_chart sends whatever to_json returns
+    def to_json(self):
+        return json.dumps(self, sort_keys=True, default=default_serialize, separators=(',', ':'))
+
+
+def _viridis(size=256):
+    # lookup table of Viridis, one RGB row per step
+    colors = px.colors.sample_colorscale('Viridis', list(np.linspace(0, 1, size)))
+    return np.array([px.colors.unlabel_rgb(color) for color in colors], dtype=np.uint8)
+
+
+VIRIDIS = _viridis()
+
+
+def colors(fractions, alpha=180):
+    # RGBA colors of values between 0 and 1 (NaN gives MISSING_COLOR), as lists for the layers
+    steps = np.clip(np.nan_to_num(fractions) * (len(VIRIDIS) - 1), 0, len(VIRIDIS) - 1).astype(int)
+    rgba = np.column_stack([VIRIDIS[steps], np.full(len(steps), alpha, dtype=np.uint8)]).tolist()
+    return [MISSING_COLOR if np.isnan(fraction) else color for fraction, color in zip(fractions, rgba)]
+
+
+def build_mapbox_deck(cube, store, classe_selected, bins=None):
+    # regions of the store filled with the facts of classe_selected summed over the years,
+    # the same values and quantile bins as build_mapbox_figure
+    values = region_facts(cube, store, [classe_selected])[0]
+    state = choropleth_state(values, bins)
+    with np.errstate(invalid='ignore'):
+        if bins:
+            fractions = state['z'] / max(bins - 1, 1)
+        else:
+            fractions = (values - state['zmin']) / ((state['zmax'] - state['zmin']) or 1)
+
+    geojson = store.geojson('low' if len(store) > DETAILED_REGIONS else 'medium')
+    features = [
+        dict(feature, properties=dict(feature['properties'], faits=None if np.isnan(value) else f"{value:,.0f}",
+                                      color=color))
+        for feature, value, color in zip(geojson['features'], values, colors(fractions))
+    ]
+
+    layer = pdk.Layer(
+        'GeoJsonLayer',
+        {'type': 'FeatureCollection', 'features': features},
+        get_fill_color='properties.color',
+        get_line_color=[255, 255, 255],
+        line_width_min_pixels=0.5,
+        pickable=True,
+    )
+    return CompactDeck(layers=[layer], initial_view_state=VIEW, map_style=MAP_STYLE,
+                       tooltip={'html': '<b>{nom}</b><br>Faits: {faits}'})
+
+
+def build_crime_rate_deck(cube, store, classe_selected, year_selected):
+    # one point per region at its centroid, colored and sized by its crime rate (%) like
+    # build_crime_rate_map
+    pourcentage = crime_rates(cube, store, classe_selected, year_selected)
+    known = ~np.isnan(pourcentage)
+    fractions = pourcentage[known] / (np.nanmax(pourcentage) or 1)
+
+    data = [
+        {'position': position, 'nom': nom, 'rate': f"{rate:.2f}", 'radius': radius, 'color': color}
+        for position, nom, rate, radius, color in zip(
+            store.centroids[known].tolist(), store.names[known].tolist(), pourcentage[known],
+            (15 * np.sqrt(fractions)).tolist(), colors(fractions))
+    ]
+
+    layer = pdk.Layer(
+        'ScatterplotLayer',
+        data,
+        get_position='position',
+        get_radius='radius',
+        get_fill_color='color',
+        radius_units='pixels',
+        radius_min_pixels=1,
+        pickable=True,
+    )
+    return CompactDeck(layers=[layer], initial_view_state=VIEW, map_style=MAP_STYLE,
+                       tooltip={'html': '<b>{nom}</b><br>pourcentage_criminalite: {rate}'})
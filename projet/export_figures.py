@@ -0,0 +1,89 @@
+import argparse
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+
+from figure_pool import load, run_jobs
+from figures import build_figure, figure_jobs, FIGURE_BUILDERS
+
+# Batch export of every chart of the Visualisation page, for every classe/year combination,
+# without streamlit nor a browser:
+#
+#   python projet/export_figures.py --output report --formats html json png
+#
+# The figures are built by a pool of processes, each worker loads the data once (see figure_pool.py).
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+FORMATS = ('html', 'json', 'png')
+
+def _slug(params):
+    # file name of a combination of parameters, e.g. "Homicides_16"
+    values = [str(value) for key, value in params.items() if key != 'title'] or ['all']
+    return re.sub(r'[^\w.-]+', '-', '_'.join(values)).strip('-')
+
+
+def _export(cube, store, chart, params, output, formats, plotlyjs):
+    # builds one figure in a worker and writes it in every format, returns the written paths
+    fig = build_figure(chart, cube, store, **params)
+    directory = os.path.join(output, chart)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, _slug(params))
+
+    paths = []
+    if 'html' in formats:
+        fig.write_html(base + '.html', include_plotlyjs=plotlyjs)
+        paths.append(base + '.html')
+    if 'json' in formats:
+        with open(base + '.json', 'w') as output_file:
+            output_file.write(fig.to_json())
+        paths.append(base + '.json')
+    if 'png' in formats:
+        fig.write_image(base + '.png')
+        paths.append(base + '.png')
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export every chart of the Visualisation page')
+    parser.add_argument('--data', default=os.path.join(PROJECT_DIR, 'data_regional.csv'))
+    parser.add_argument('--geojson', default=os.path.join(PROJECT_DIR, 'regions.geojson'))
+    parser.add_argument('--output', default='figures')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['html', 'json'])
+    parser.add_argument('--charts', nargs='+', choices=sorted(FIGURE_BUILDERS), help='only export these charts')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--plotlyjs', default='cdn',
+                        help="include_plotlyjs of the html files: 'cdn' (small files) or True (offline files)")
+    args = parser.parse_args()
+
+    formats = set(args.formats)
+    # PNG needs a local renderer (kaleido)
+    if 'png' in formats and importlib.util.find_spec('kaleido') is None:
+        print('kaleido is not installed, the PNG files are skipped', file=sys.stderr)
+        formats.discard('png')
+    plotlyjs = True if args.plotlyjs == 'True' else args.plotlyjs
+
+    # the list of jobs only needs the cube, the workers load their own copy of the data
+    cube, _ = load(args.data, args.geojson)
+    jobs = figure_jobs(cube, args.charts)
+    print(f'{len(jobs)} figures to export with {args.workers} workers')
+
+    start = time.perf_counter()
+    results, failures = run_jobs(_export, [(chart, params, (args.output, formats, plotlyjs)) for chart, params in jobs],
+                                 args.data, args.geojson, args.workers)
+    index = [{'chart': chart, 'params': params, 'files': files} for chart, params, files in results]
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, 'index.json'), 'w') as index_file:
+        json.dump(sorted(index, key=lambda row: (row['chart'], _slug(row['params']))), index_file,
+                  indent=2, default=str)
+
+    print(f'{len(index)} figures exported in {time.perf_counter() - start:.1f} s to {args.output}')
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Bounded LRU of built figures. A figure is stored under the name of its chart and the inputs it
+# was built from (data version and widget values), so a rerun only rebuilds the charts whose
+# inputs changed. The instance used by the app is shared by all the sessions (see functions.py).
+#
+# With a `directory`, a figure missing from memory is first looked up on disk, where the warm-up
+# job (warm_figures.py) writes the plotly JSON of every figure under the hash of its name and
+# inputs, so the figures of a new deploy are read instead of built.
+
+
+def _plain(value):
+    # JSON value of the numpy scalars and arrays found in the inputs
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return str(value)
+
+
+def figure_key(name, inputs):
+    # content address of a figure: the hash of its chart name and inputs
+    text = json.dumps([name, list(inputs)], default=_plain, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def figure_path(directory, key):
+    return os.path.join(directory, key[:2], key + '.json')
+
+
+def read_figure(path):
+    # plotly figure stored by write_figure, None when there is none
+    import plotly.io as pio
+
+    try:
+        with open(path) as figure_file:
+            text = figure_file.read()
+    except OSError:
+        return None
+    # the JSON was written by plotly, it is not validated again
+    return pio.from_json(text, skip_invalid=True)
+
+
+def write_figure(path, figure):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as figure_file:
+        figure_file.write(figure.to_json())
+    os.replace(path + '.tmp', path)
+
+
+class FigureCache:
+
+    def __init__(self, maxsize=256, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.disk_hits = {}
+        self.misses = {}
+        self.build_seconds = {}
+
+    def get_or_build(self, name, inputs, build):
+        key = (name,) + tuple(inputs)
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return self._figures[key]
+
+        figure = None
+        if self.directory is not None:
+            figure = read_figure(figure_path(self.directory, figure_key(name, inputs)))
+
+        if figure is not None:
+            with self._lock:
+                self.disk_hits[name] = self.disk_hits.get(name, 0) + 1
+        else:
+            # the figure is built outside the lock, two sessions missing the same key at the same
+            # time both build it, which is cheaper than blocking every chart behind one build
+            start = time.perf_counter()
+            figure = build()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.misses[name] = self.misses.get(name, 0) + 1
+                self.build_seconds[name] = self.build_seconds.get(name, 0.0) + elapsed
+
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def __len__(self):
+        return len(self._figures)
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+    def stats(self):
+        # one row per chart: hits (in memory, on disk), misses and total time spent building its figures
+        names = sorted(set(self.hits) | set(self.disk_hits) | set(self.misses))
+        return [
+            {
+                'chart': name,
+                'hits': self.hits.get(name, 0),
+                'disk_hits': self.disk_hits.get(name, 0),
+                'misses': self.misses.get(name, 0),
+                'build_seconds': round(self.build_seconds.get(name, 0.0), 4),
+            }
+            for name in names
+        ]
@@ -0,0 +1,48 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from data_store import file_signature
+from geometry_store import read_geometry_store
+from partition_store import read_cube
+
+# Pool of processes building figures outside of the app, used by the warm-up of the figure cache
+# (warm_figures.py) and the batch export (export_figures.py). Every worker loads the cube and the
+# geometry store once, the same way as the app, so the versions of the figures are the same.
+
+_cube = None
+_store = None
+
+
+def load(data_path, geojson_path):
+    # cube and geometry store of the app (see functions.load_cube and functions.load_geometry_store)
+    return read_cube(data_path), read_geometry_store(geojson_path, version=file_signature(geojson_path))
+
+
+def _init_worker(data_path, geojson_path):
+    global _cube, _store
+    _cube, _store = load(data_path, geojson_path)
+
+
+def _run(function, chart, params, args):
+    return function(_cube, _store, chart, params, *args)
+
+
+def run_jobs(function, jobs, data_path, geojson_path, workers):
+    # Calls function(cube, store, chart, params, *args) for every (chart, params, args) of `jobs`
+    # in the pool. Returns the (chart, params, result) of the jobs that succeeded and the number
+    # of failures, which are printed on stderr. The parent should load the data first, so the
+    # partitions are refreshed once before the workers read them.
+    results = []
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data_path, geojson_path)) as executor:
+        futures = {executor.submit(_run, function, chart, params, args): (chart, params)
+                   for chart, params, args in jobs}
+        for future in as_completed(futures):
+            chart, params = futures[future]
+            try:
+                results.append((chart, params, future.result()))
+            except Exception as error:
+                failures += 1
+                print(f'{chart} {params}: {error}', file=sys.stderr)
+    return results, failures
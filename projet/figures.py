@@ -0,0 +1,407 @@
+import hashlib
+import os
+import numpy as np
+import plotly
+import plotly.express as px
+import plotly.graph_objects as go
+import shapely
+
+# Figure builders of the Visualisation page: data and parameters in, plotly figure out.
+# Nothing here depends on streamlit, so the same figures are built by the app (functions.py),
+# the benchmarks and the batch export (export_figures.py).
+
+
+def build_pie_chart(cube, classe_selected):
+    data_grouped = cube.query('faits', by=['Code.région'], where={'classe': classe_selected}).reset_index()
+    fig = px.pie(data_grouped, names='Code.région', values='faits', 
+                 title=f"Distribution of facts for the class '{classe_selected}'")
+    return fig
+
+
+def build_mapbox_figure(cube, store, classe_selected=None, bins=None):
+    # One choropleth trace over the simplified regions of the store, with a menu to switch
+    # between the classes (all of them, or only classe_selected). The values are the facts of
+    # each region summed over the years. With `bins`, the colors are quantile bins computed here.
+    classes = cube.coordinates('classe') if classe_selected is None else [classe_selected]
+    values = region_facts(cube, store, classes)
+    states = [choropleth_state(row, bins) for row in values]
+
+    fig = go.Figure(go.Choroplethmapbox(
+        geojson=store.geojson('medium'),
+        locations=store.codes,
+        text=store.names,
+        marker_opacity=0.6,
+        marker_line_width=0.5,
+        hovertemplate='%{text}<br>Faits: %{customdata:,.0f}<extra></extra>',
+        **states[0]
+    ))
+
+    buttons = [
+        dict(label=classe, method='update',
+             args=[_restyle_args(state),
+                   {'title.text': f"Distribution of facts for the crime :'{classe}'"}])
+        for classe, state in zip(classes, states)
+    ]
+
+    fig.update_layout(
+        title=dict(text=f"Distribution of facts for the crime :'{classes[0]}'", y=0.98),
+        mapbox=dict(style="carto-positron", zoom=5, center={"lat": 46.603354, "lon": 1.888334}),
+        updatemenus=[dict(buttons=buttons, x=0.01, y=0.99, xanchor='left', yanchor='top')] if len(classes) > 1 else [],
+        margin={"r": 0, "t": 30, "l": 0, "b": 0}
+    )
+    return fig
+
+
+def region_facts(cube, store, classes):
+    # (classe x region of the store) array of the facts summed over the years, NaN for the
+    # regions of the store without data
+    faits = cube.query('faits', by=['classe', 'Code.région'], where={'classe': list(classes)}, keep_empty=True)
+
+    positions = store.positions(cube.regions)
+    values = np.full((len(classes), len(store)), np.nan)
+    for i, classe in enumerate(classes):
+        region_values = faits.loc[classe].reindex(cube.regions).to_numpy()
+        values[i, positions[positions >= 0]] = region_values[positions >= 0]
+    return values
+
+
+def choropleth_state(values, bins=None):
+    # trace properties that change with the classe: the color values, the real values for the
+    # hover and, with bins, the colorbar labels of the bins (also used by deck_maps.py)
+    if not bins:
+        return dict(z=values, customdata=values, colorscale='Viridis', zmin=np.nanmin(values),
+                    zmax=np.nanmax(values), colorbar=dict(tickvals=None, ticktext=None))
+
+    edges = np.unique(np.nanquantile(values, np.linspace(0, 1, bins + 1)))
+    codes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+    codes = np.where(np.isnan(values), np.nan, codes)
+    labels = [f"{low:,.0f} - {high:,.0f}" for low, high in zip(edges[:-1], edges[1:])]
+    return dict(z=codes, customdata=values, colorscale=_discrete_colorscale(bins), zmin=-0.5,
+                zmax=bins - 0.5, colorbar=dict(tickvals=list(range(len(labels))), ticktext=labels))
+
+
+def _restyle_args(state):
+    # the colorbar is updated with flat keys so that only the ticks are replaced
+    args = {key: [value] for key, value in state.items() if key != 'colorbar'}
+    for key, value in state['colorbar'].items():
+        args[f'colorbar.{key}'] = [value]
+    return args
+
+
+def _discrete_colorscale(bins):
+    # Viridis cut into `bins` flat steps
+    colors = px.colors.sample_colorscale('Viridis', [i / max(bins - 1, 1) for i in range(bins)])
+    scale = []
+    for i, color in enumerate(colors):
+        scale += [[i / bins, color], [(i + 1) / bins, color]]
+    return scale
+
+
+def build_3d_barchart_figure(cube, store):
+    # one trace per classe, where the bars are the segments of a single line, and one trace for
+    # all the outlines (see benchmarks/bench_3d_barchart.py for the previous one trace per bar)
+    df = cube.query('faits', by=['classe', 'annee', 'Code.région']).reset_index()
+    fig = go.Figure()
+
+    colors = px.colors.qualitative.Plotly
+    classes = df['classe'].unique()
+
+    offset = 0.02
+
+    # the centroid of each row is taken from the store, rows without geometry are not drawn
+    positions = store.positions(df['Code.région'])
+    known = positions >= 0
+    lon = store.centroids[positions[known], 0]
+    lat = store.centroids[positions[known], 1]
+    row_classes = df['classe'].to_numpy()[known]
+    faits = df['faits'].to_numpy(dtype=float)[known]
+
+    for i, classe in enumerate(classes):
+        mask = row_classes == classe
+        x = lon[mask] + i * offset
+        y = lat[mask] + i * offset
+        dz = faits[mask]
+        fig.add_trace(go.Scatter3d(
+            x=_bar_segments(x, x),
+            y=_bar_segments(y, y),
+            z=_bar_segments(np.zeros(len(dz)), dz),
+            mode='lines',
+            line=dict(color=colors[i % len(colors)], width=6),
+            name=classe,
+            hoverinfo='text',
+            hovertext=classe
+        ))
+
+    # the outlines only need the low resolution polygons
+    x, y = _ring_segments(_exterior_rings(store.geometry('low')))
+    fig.add_trace(go.Scatter3d(
+        x=x,
+        y=y,
+        z=np.zeros(len(x)),
+        mode='lines',
+        line=dict(color='black', width=2),
+        hoverinfo='skip',
+        showlegend=False
+    ))
+
+    fig.update_layout(
+        scene=dict(
+            xaxis_title='Longitude',
+            yaxis_title='Latitude',
+            zaxis_title='Nombre de faits',
+            xaxis=dict(showgrid=False),
+            yaxis=dict(showgrid=False),
+        ),
+        margin=dict(r=0, t=0, l=0, b=0),
+        showlegend=True
+    )
+    return fig
+
+
+def _bar_segments(start, end):
+    # each bar is the segment start -> end followed by a NaN, so that one trace draws all the bars
+    segments = np.full(len(start) * 3, np.nan)
+    segments[0::3] = start
+    segments[1::3] = end
+    return segments
+
+
+def _exterior_rings(geometry):
+    # list of (x, y) arrays, one for the exterior ring of every polygon
+    polygons = shapely.get_parts(geometry.values)
+    return [tuple(shapely.get_coordinates(ring).T) for ring in shapely.get_exterior_ring(polygons)]
+
+
+def _ring_segments(rings):
+    # all the rings in two arrays, separated by NaN
+    x = np.concatenate([np.append(ring_x, np.nan) for ring_x, _ in rings])
+    y = np.concatenate([np.append(ring_y, np.nan) for _, ring_y in rings])
+    return x, y
+
+
+# above this number of bar segments the values are only shown on hover
+VICT_MEC_LABEL_LIMIT = 300
+
+
+def build_vict_mec_figure(cube, unit, title, year=None, label_limit=VICT_MEC_LABEL_LIMIT):
+    # one bar segment per (region, classe): the facts of `year` or, with year=None, summed over
+    # all the years by the cube, instead of one segment per year stacked on each other
+    where = {'unité.de.compte': unit}
+    if year is not None:
+        where['annee'] = year
+    data = cube.query('faits', by=['classe', 'Code.région'], where=where).reset_index()
+
+    fig = px.bar(data, 
+                 x='Code.région', 
+                 y='faits', 
+                 color='classe', 
+                 title=title if year is None else f"{title} ({year})",
+                 labels={'Code.région': 'Code de région', 'faits': 'Nombre de faits'},
+                 text='faits' if len(data) <= label_limit else None)
+    return fig
+
+
+def build_crime_rate_map(cube, store, classe_selected, year_selected):
+    # the rates of every classe, year and region are computed in one pass by the cube (and kept),
+    # with the region axis in the order of the store so the centroids are read directly
+    pourcentage = crime_rates(cube, store, classe_selected, year_selected)
+    known = ~np.isnan(pourcentage)
+
+    fig = px.scatter_mapbox(
+        lat=store.centroids[known, 1],
+        lon=store.centroids[known, 0],
+        size=pourcentage[known], 
+        color=pourcentage[known],  
+        hover_name=store.names[known],
+        labels={'color': 'pourcentage_criminalite', 'size': 'pourcentage_criminalite'},
+        color_continuous_scale=px.colors.sequential.Viridis,  
+        size_max=15,  
+        zoom=5,
+        mapbox_style="open-street-map",
+        range_color=[0, np.nanmax(pourcentage)],
+        title=f"Crime rate (%) for '{classe_selected}', year {year_selected}"
+    )
+    return fig
+
+
+def crime_rates(cube, store, classe_selected, year_selected):
+    # crime rate (%) of every region of the store for a classe and a year, NaN without data
+    coordinates, rates = cube.rates(per=100, regions=store.codes)
+    classe_rates = rates[list(coordinates['classe']).index(classe_selected)]
+    return classe_rates[list(coordinates['annee']).index(year_selected)]
+
+
+def build_dynamic_plot(cube):
+    # one line per year, the slider shows one of them; the lines are the rows of the
+    # (year x region) matrix of the cube
+    years = cube.coordinates('annee')
+    regions = cube.coordinates('Code.région')
+    faits = cube.matrix('faits')
+
+    fig = go.Figure([
+        go.Scatter(
+            visible=i == 0,
+            line=dict(color='#4682B4', width=3),
+            name=f"Année: {year}",
+            x=regions,
+            y=row,
+            mode='lines+markers',
+            hovertemplate='Région: %{x}<br>Total des Faits: %{y}'
+        )
+        for i, (year, row) in enumerate(zip(years, faits))
+    ])
+
+    steps = []
+    for i, year in enumerate(years):
+        visible = [False] * len(years)
+        visible[i] = True
+        steps.append(dict(
+            method="update",
+            args=[{"visible": visible},
+                  {"title": f"Data for the year: {year}"}],
+        ))
+
+    sliders = [dict(
+        active=0, 
+        currentvalue={"prefix": "Année: "},
+        pad={"t": 50},
+        steps=steps
+    )]
+
+    fig.update_layout(
+        sliders=sliders,
+        xaxis_title="Code Région",
+        yaxis_title="Number of Crimes",
+        template="plotly_white"
+    )
+
+    return fig
+
+
+def build_ensemble_figure(cube, selection):
+    # Facts of every region animated over the years. Each animation frame is one trace built from
+    # a row of the (year x region) matrix of the cube, whatever the number of regions, with the
+    # regions told apart by the color of their marker or bar.
+    years = cube.coordinates('annee')
+    regions = cube.coordinates('Code.région')
+    faits = cube.matrix('faits')
+    maximum = np.nanmax(faits)
+    colors = [px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)] for i in range(len(regions))]
+
+    def trace(row):
+        if selection == 'Scatter':
+            # same bubble scale as plotly express with size_max=20
+            return dict(type='scatter', x=regions, y=row, mode='markers', text=regions,
+                        hovertemplate='<b>%{text}</b><br>faits=%{y}<extra></extra>',
+                        marker=dict(size=np.nan_to_num(row), sizemode='area', sizeref=2 * maximum / 20 ** 2,
+                                    sizemin=0, color=colors))
+        return dict(type='bar', x=regions, y=row, marker=dict(color=colors),
+                    hovertemplate='Code.région=%{x}<br>faits=%{y}<extra></extra>')
+
+    margin = 10 if selection == 'Scatter' else 100000
+    frames = [dict(name=str(year), data=[trace(row)]) for year, row in zip(years, faits)]
+    steps = [dict(label=str(year), method='animate',
+                  args=[[str(year)], dict(mode='immediate', frame=dict(duration=0, redraw=True),
+                                          transition=dict(duration=0))])
+             for year in years]
+    play = dict(label='&#9654;', method='animate',
+                args=[None, dict(frame=dict(duration=500, redraw=True), fromcurrent=True,
+                                 transition=dict(duration=500, easing='linear'))])
+    pause = dict(label='&#9724;', method='animate',
+                 args=[[None], dict(mode='immediate', frame=dict(duration=0, redraw=True),
+                                    transition=dict(duration=0))])
+
+    return go.Figure(dict(
+        data=[trace(faits[0])],
+        frames=frames,
+        layout=dict(
+            xaxis=dict(title='Code.région', type='category', categoryorder='array', categoryarray=regions),
+            yaxis=dict(title='faits', range=[0, maximum + margin]),
+            updatemenus=[dict(type='buttons', direction='left', buttons=[play, pause], showactive=False,
+                              x=0.1, y=0, xanchor='right', yanchor='top', pad=dict(r=10, t=70))],
+            sliders=[dict(active=0, steps=steps, currentvalue=dict(prefix='annee='),
+                          x=0.1, y=0, xanchor='left', yanchor='top', len=0.9, pad=dict(b=10, t=60))],
+        ),
+    ))
+
+
+# number of color bins of the crime map when binning is enabled
+MAP_BINS = 5
+
+# units of courbes_vict_mec and the title of their chart
+VICT_MEC_CHARTS = [('victime', 'Facts suffered by the victims'),
+                   ('Mis en cause', 'Facts performed by the accused')]
+
+
+# Builders by chart name (the names of the functions of the page), called as
+# builder(cube, store, **parameters), and the parameters taken by the widgets of each chart.
+FIGURE_BUILDERS = {
+    'plot_pie_chart': lambda cube, store, **params: build_pie_chart(cube, **params),
+    'plot_mapbox': build_mapbox_figure,
+    'plot_3d_barchart_map': build_3d_barchart_figure,
+    'courbes_vict_mec': lambda cube, store, **params: build_vict_mec_figure(cube, **params),
+    'map_taux_crim': build_crime_rate_map,
+    'dynamic_plot': lambda cube, store: build_dynamic_plot(cube),
+    'ensemble_viz_faits_region': lambda cube, store, **params: build_ensemble_figure(cube, **params),
+}
+
+
+# Versions of the data each chart depends on, part of the inputs under which its figures are cached
+FIGURE_VERSIONS = {
+    'plot_pie_chart': lambda cube, store, **params: (cube.version,),
+    'plot_mapbox': lambda cube, store, **params: (cube.version, store.version),
+    'plot_3d_barchart_map': lambda cube, store, **params: (cube.version, store.version),
+    # the charts of one year only depend on the data of that year
+    'courbes_vict_mec': lambda cube, store, year=None, **params: (
+        cube.version if year is None else cube.version_for([year]),),
+    'map_taux_crim': lambda cube, store, year_selected, **params: (cube.version_for([year_selected]), store.version),
+    'dynamic_plot': lambda cube, store, **params: (cube.version,),
+    'ensemble_viz_faits_region': lambda cube, store, **params: (cube.version,),
+}
+
+
+# modules whose code decides what the figures look like
+BUILDER_MODULES = ('figures.py', 'deck_maps.py', 'cube.py', 'geometry_store.py')
+
+
+def builder_version():
+    # hash of the code of the builders and of the plotly version, so that the figures cached on
+    # disk before a deploy that changed them are not found anymore (and pruned by the warm-up job)
+    digest = hashlib.sha1(plotly.__version__.encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in BUILDER_MODULES:
+        with open(os.path.join(directory, name), 'rb') as module:
+            digest.update(module.read())
+    return digest.hexdigest()[:12]
+
+
+BUILDER_VERSION = builder_version()
+
+
+def figure_inputs(chart, cube, store, **params):
+    # inputs of a figure in the figure cache: the version of the builders, the data versions and
+    # the parameters. The app (functions.cached_chart) and the warm-up job (warm_figures.py) both
+    # use it, so the figures written by the job are found by the app.
+    return (BUILDER_VERSION,) + FIGURE_VERSIONS[chart](cube, store, **params) + tuple(sorted(params.items()))
+
+
+def figure_jobs(cube, charts=None):
+    # every (chart, parameters) combination of the classes, years and modes of the data, with the
+    # parameters set by the widgets of the page
+    classes = list(cube.coordinates('classe'))
+    years = list(cube.coordinates('annee'))
+    jobs = {
+        'plot_pie_chart': [{'classe_selected': classe} for classe in classes],
+        'plot_mapbox': [{'bins': None}, {'bins': MAP_BINS}],
+        'plot_3d_barchart_map': [{}],
+        'courbes_vict_mec': [{'unit': unit, 'title': title, 'year': year}
+                             for unit, title in VICT_MEC_CHARTS for year in [None] + years],
+        'map_taux_crim': [{'classe_selected': classe, 'year_selected': year} for classe in classes for year in years],
+        'dynamic_plot': [{}],
+        'ensemble_viz_faits_region': [{'selection': 'Scatter'}, {'selection': 'Bar'}],
+    }
+    return [(chart, params) for chart in (charts or FIGURE_BUILDERS) for params in jobs[chart]]
+
+
+def build_figure(chart, cube, store, **params):
+    return FIGURE_BUILDERS[chart](cube, store, **params)
@@ -1,63 +1,189 @@
+import os
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import geopandas as gpd
-from functions import *
-import plotly.express as px
-import plotly.graph_objects as go
-import geopandas as gpd
-import numpy as np
-from wordcloud import WordCloud
+from data_store import CSV_OPTIONS, file_signature, read_regional_data
+from geometry_store import read_geometry_store
+from cube import FactCube
+from figure_cache import FigureCache
+from figures import BUILDER_VERSION, MAP_BINS, VICT_MEC_CHARTS, build_figure, figure_inputs
+from deck_maps import build_crime_rate_deck, build_mapbox_deck
+from partition_store import manifest_hash, read_cube, refresh_partitions
+from table_index import TableIndex
+import profiling
+from profiling import profiled
+from spatial_join import POINT_DTYPES, aggregate_points, assign_file
 
 
 # ------------------ VISUALISATION OF MY DATASET -------------------- #
 
-def load_geojson(local_path):
+# The loaders below are cached on the signature of their files with max_entries=1: when a file
+# changes, the new frame, cube or store replaces the previous one instead of being kept next to it.
+
+def load_geojson(local_path, level='full'):
     # we load the geojson file to have the coordinates of regions
-    gdf = gpd.read_file(local_path)
-    return gdf
+    return load_geometry_store(local_path).frame(level)
 
-def load_data(filepath):
-    # This function is for charging the csv file for our data
-    df = pd.read_csv(filepath, delimiter=';')
-    return df
+@profiled
+def load_geometry_store(local_path):
+    # the geometry is read and simplified once per process, see geometry_store.py
+    return _load_geometry_store(local_path, file_signature(local_path))
 
-def print_table(df):
-    # this function is for printing all we want to see from the data in our dataset 
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_geometry_store(local_path, signature):
+    return read_geometry_store(local_path, version=signature)
 
-    all_columns = df.columns.tolist()
+@profiled
+def load_data(filepath):
+    # This function is for charging the csv file for our data, it is parsed once and then shared
+    # between reruns and sessions until the file changes on disk
+    return _load_data(filepath, file_signature(filepath))
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_data(filepath, signature):
+    # the signature is only there to be part of the cache key
+    return read_regional_data(filepath)
+
+@profiled
+def load_table_index(filepath):
+    # value indexes of the data for the table explorer, built column by column (see table_index.py)
+    return _load_table_index(filepath, file_signature(filepath))
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_table_index(filepath, signature):
+    return TableIndex(_load_data(filepath, signature))
+
+@profiled
+def load_cube(filepath):
+    # aggregates of the data used by the charts, built once with the data (see cube.py)
+    placeholder = st.empty()
+
+    def progress(fraction, rows):
+        placeholder.progress(fraction, text=f"Reading {filepath}: {rows:,} rows")
+
+    # The partitions are refreshed first (only a stat when the csv did not change), so the key
+    # holds the manifest the cube is built from, including the releases ingested with the
+    # command line (python projet/partition_store.py)
+    partitions = refresh_partitions(filepath, progress)
+    cube = _load_cube(filepath, file_signature(filepath), manifest_hash(filepath), progress)
+    placeholder.empty()
+    stats = partitions.ingestion if partitions is not None else cube.ingestion
+    if stats is not None:
+        peak = f", peak RSS {stats['peak_rss'] / 1024 ** 2:.0f} MB" if stats['peak_rss'] else ""
+        st.caption(f"{stats['rows']:,} rows aggregated in {stats['seconds']:.1f} s "
+                   f"({stats['rows_per_second']:,.0f} rows/s{peak})")
+    return cube
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_cube(filepath, signature, manifest, _progress=None):
+    # from the yearly partitions, streamed or loaded when they cannot be written (see partition_store.read_cube)
+    return read_cube(filepath, _progress, data=lambda: _load_data(filepath, signature))
+
+@profiled
+def load_point_cube(points_path, geojson_path, data_path):
+    # cube of geolocated incidents joined to the regions of the geojson (see spatial_join.py),
+    # with the populations of the regional data for the rates
+    signature = tuple(file_signature(path) for path in (points_path, geojson_path, data_path))
+    return _load_point_cube(points_path, geojson_path, data_path, signature)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_point_cube(points_path, geojson_path, data_path, signature):
+    codes = assign_file(points_path, load_geometry_store(geojson_path))
+    points = pd.read_csv(points_path, usecols=lambda column: column not in ('longitude', 'latitude'),
+                         dtype=POINT_DTYPES, **CSV_OPTIONS)
+    return FactCube.from_frame(aggregate_points(points, codes, load_data(data_path)), version=signature)
+
+# number of figures kept in memory for all the sessions
+FIGURE_CACHE_SIZE = 256
+# figures written by the warm-up job (python projet/warm_figures.py), read when missing from memory
+FIGURE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'figure_cache')
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    return FigureCache(maxsize=FIGURE_CACHE_SIZE, directory=FIGURE_CACHE_DIR)
+
+def cached_figure(name, inputs, build):
+    # returns the figure of the chart `name` built from `inputs`, build() is only called on a miss
+    get_or_build = profiled(get_figure_cache().get_or_build, name=f'figure {name}')
+    return get_or_build(name, inputs, profiled(build, name=f'build {name}'))
+
+def cached_chart(chart, cube, store=None, **params):
+    # figure of a chart of figures.FIGURE_BUILDERS, under the same inputs as the warm-up job
+    return cached_figure(chart, figure_inputs(chart, cube, store, **params),
+                         lambda: build_figure(chart, cube, store, **params))
+
+def show_figure_cache_stats(rerun_seconds=None):
+    # debug information for the profiling runs only (PORTFOLIO_PROFILE, see profiling.py)
+    if not profiling.ENABLED:
+        return
+    cache = get_figure_cache()
+    with st.expander("Figure cache statistics"):
+        if rerun_seconds is not None:
+            st.write(f"This rerun took {rerun_seconds * 1000:.0f} ms, {len(cache)} figures are cached.")
+        st.dataframe(pd.DataFrame(cache.stats()), hide_index=True)
+
+@profiled
+def print_table(table):
+    # this function is for printing all we want to see from the data in our dataset,
+    # the filters go through the value indexes of the table (see table_index.py)
+
+    all_columns = table.columns
     selected_columns = st.multiselect(
         'Select columns to display', 
         options=all_columns, 
         default=all_columns[:5] 
     )
 
-    selected_filter_column = st.selectbox('Select a column to filter', options=all_columns)
+    selected_filter_columns = st.multiselect('Select the columns to filter', options=all_columns,
+                                             default=all_columns[:1])
 
-    if selected_filter_column:
-        unique_values = df[selected_filter_column].unique().tolist()
-        selected_value = st.selectbox(f'Select a value from {selected_filter_column}', options=unique_values)
-        filtered_df = df[df[selected_filter_column] == selected_value]
+    filters = {}
+    for column in selected_filter_columns:
+        filters[column] = st.selectbox(f'Select a value from {column}', options=table.values(column))
 
-        if selected_columns:
-            num_rows = min(5, len(filtered_df))
+    positions = table.positions(filters)
+    if selected_filter_columns:
+        description = ", ".join(f"{column} = '{value}'" for column, value in filters.items())
+        st.caption(" · ".join(f"{column} = '{value}': {table.count(column, value):,} rows"
+                              for column, value in filters.items()))
 
-            if num_rows > 0:
-                random_rows = filtered_df[selected_columns].sample(n=num_rows)
-                st.write(f"Here are some random rows for '{selected_value}' from the selected columns:")
+        if selected_columns:
+            if len(positions) > 0:
+                random_rows = table.sample(positions, 5, columns=selected_columns)
+                st.write(f"Here are some random rows for {description} from the selected columns "
+                         f"({len(positions):,} matching rows):")
                 st.dataframe(random_rows)
             else:
-                st.write(f"No data available for {selected_value} in column {selected_filter_column}.")
-
-def plot_pie_chart(df):
+                st.write(f"No data available for {description}.")
+
+    if selected_columns and len(positions) > 0:
+        browse_table(table, positions, selected_columns)
+
+# rows per page of the table explorer
+PAGE_SIZES = [25, 100, 500]
+
+def browse_table(table, positions, columns):
+    # the filtered rows page by page, only the rows and columns of the page are sent to the browser
+    with st.expander(f"Browse the {len(positions):,} rows", expanded=False):
+        sort_column = st.selectbox('Sort by', options=[None] + table.columns,
+                                   format_func=lambda column: 'Table order' if column is None else column)
+        descending = st.checkbox('Descending', value=False)
+        page_size = st.selectbox('Rows per page', options=PAGE_SIZES)
+        pages = (len(positions) - 1) // page_size + 1
+        page = st.number_input(f'Page (1 to {pages:,})', min_value=1, max_value=pages, value=1, step=1)
+
+        if sort_column is not None:
+            positions = table.sort(positions, sort_column, descending)
+        first = (page - 1) * page_size
+        st.dataframe(table.page(positions, page - 1, page_size, columns))
+        st.caption(f"Rows {first + 1:,} to {min(first + page_size, len(positions)):,} of {len(positions):,}")
+
+@profiled
+def plot_pie_chart(cube):
    
     st.header("Pie chart view of facts by region")
     
-    classe_selected = st.selectbox("Select the fact of the crime :", df['classe'].unique())
-    filtered_data = df[df['classe'] == classe_selected]
-    data_grouped = filtered_data.groupby('Code.région')['faits'].sum().reset_index()
-    fig = px.pie(data_grouped, names='Code.région', values='faits', 
-                 title=f"Distribution of facts for the class '{classe_selected}'")
+    classe_selected = st.selectbox("Select the fact of the crime :", cube.coordinates('classe'))
+    fig = cached_chart('plot_pie_chart', cube, classe_selected=classe_selected)
 
     st.plotly_chart(fig)
     st.markdown("""
@@ -69,40 +195,28 @@ def plot_pie_chart(df):
     a safer environment for all residents.
     """)
 
-def plot_mapbox(df, gdf):
+# Plotly draws the maps in SVG, Deck.gl (pydeck) with WebGL for the large geographies
+MAP_BACKENDS = ['Plotly', 'Deck.gl']
+
+@profiled
+def plot_mapbox(cube, store):
     
     st.header("Interactive crime map of France (using Mapbox)")
-    classe_selected = st.selectbox("Select the fact:", df['classe'].unique())
- 
-    filtered_data = df[df['classe'] == classe_selected]
-    filtered_data['Code.région'] = filtered_data['Code.région'].astype(str)
-    gdf['region_code'] = gdf['code'].astype(str)  
-
-    if not isinstance(gdf, gpd.GeoDataFrame):
-        gdf = gpd.GeoDataFrame(gdf, geometry=gpd.GeoSeries(gdf['geometry']))
-
-    merged_data = pd.merge(filtered_data, gdf[['region_code', 'geometry']], 
-                           left_on='Code.région', right_on='region_code', how='left')
-
-    merged_data = gpd.GeoDataFrame(merged_data, geometry='geometry') 
-    geojson_data = merged_data.__geo_interface__  
-
-    fig = px.choropleth_mapbox(
-        merged_data,
-        geojson=geojson_data,
-        locations='Code.région',
-        featureidkey='properties.region_code', 
-        color='faits',
-        color_continuous_scale="Viridis", 
-        mapbox_style="carto-positron",
-        zoom=5,
-        center={"lat": 46.603354, "lon": 1.888334},  
-        opacity=0.6,
-        title=f"Distribution of facts for the crime :'{classe_selected}'"
-    )
-  
-    fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
-    st.plotly_chart(fig)
+    # the fact is chosen in the menu of the map: the regions are sent once with the values of every
+    # fact, and changing the fact only swaps the vector of values in the browser
+    backend = st.radio("Map backend :", MAP_BACKENDS, horizontal=True, key='plot_mapbox_backend')
+    binned = st.checkbox("Color the regions by quantile bins")
+    bins = MAP_BINS if binned else None
+
+    if backend == 'Deck.gl':
+        # the deck has no menu, the fact is chosen here and the map is drawn by the GPU
+        classe_selected = st.selectbox("Select the fact :", cube.coordinates('classe'), key='plot_mapbox_classe')
+        deck = cached_figure('plot_mapbox', (BUILDER_VERSION, cube.version, store.version, bins, backend, classe_selected),
+                             lambda: build_mapbox_deck(cube, store, classe_selected, bins))
+        st.pydeck_chart(deck)
+    else:
+        fig = cached_chart('plot_mapbox', cube, store, bins=bins)
+        st.plotly_chart(fig)
 
     st.markdown("""
     The interactive map of crimes uses a color gradient from violet to yellow, 
@@ -112,84 +226,11 @@ def plot_mapbox(df, gdf):
     most impacted by crime but also serves as a critical tool for understanding regional disparities. 
     """)
 
-def plot_3d_barchart_map(df, gdf):
+@profiled
+def plot_3d_barchart_map(cube, store):
     st.header("Interactive map with distinct 3D bars for each facts")
 
-    if not isinstance(gdf, gpd.GeoDataFrame):
-        gdf = gpd.GeoDataFrame(gdf, geometry=gpd.GeoSeries(gdf['geometry']))
-  
-    df['Code.région'] = df['Code.région'].astype(str)
-    gdf['region_code'] = gdf['code'].astype(str)
-
-    merged_data = pd.merge(df, gdf[['region_code', 'geometry']], 
-                           left_on='Code.région', right_on='region_code', how='left')
-
-    merged_data = gpd.GeoDataFrame(merged_data, geometry='geometry')
-
-    fig = go.Figure()
-
-    colors = px.colors.qualitative.Plotly
-    classes = df['classe'].unique()
-
-    offset = 0.02
-
-    for i, classe in enumerate(classes):
-        classe_data = merged_data[merged_data['classe'] == classe]
-
-        x = classe_data['geometry'].centroid.x.tolist()
-        y = classe_data['geometry'].centroid.y.tolist()
-        z = np.zeros(len(classe_data)).tolist() 
-        dz = classe_data['faits'].tolist()  
-
-        x_offset = [xi + (i * offset) for xi in x] 
-        y_offset = [yi + (i * offset) for yi in y]  
-      
-        for j in range(len(x)):
-
-            name = classe if j == 0 else None
-            fig.add_trace(go.Scatter3d(
-                x=[x_offset[j], x_offset[j], x_offset[j]],  
-                y=[y_offset[j], y_offset[j], y_offset[j]], 
-                z=[0, dz[j], 0], 
-                mode='lines',
-                line=dict(color=colors[i % len(colors)], width=6),  
-                name=name,  
-                showlegend=name is not None, 
-                hoverinfo='text',  
-                hovertext=classe 
-            ))
-
-    for _, region in gdf.iterrows():
-        geometry = region['geometry']
-        
-        if geometry.geom_type == 'Polygon':
-            polygons = [geometry]
-        elif geometry.geom_type == 'MultiPolygon':
-            polygons = geometry.geoms
-        
-        for polygon in polygons:
-            x, y = polygon.exterior.xy
-            fig.add_trace(go.Scatter3d(
-                x=list(x),
-                y=list(y),
-                z=[0]*len(x),
-                mode='lines',
-                line=dict(color='black', width=2),
-                showlegend=False
-            ))
-    
- 
-    fig.update_layout(
-        scene=dict(
-            xaxis_title='Longitude',
-            yaxis_title='Latitude',
-            zaxis_title='Nombre de faits',
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=False),
-        ),
-        margin=dict(r=0, t=0, l=0, b=0),
-        showlegend=True
-    )
+    fig = cached_chart('plot_3d_barchart_map', cube, store)
 
     st.plotly_chart(fig)
     st.markdown("""
@@ -199,30 +240,18 @@ def plot_3d_barchart_map(df, gdf):
     By breaking down crime statistics by type, we can better comprehend the challenges faced by communities and develop tailored strategies to address these pressing issues.
     """)
 
-def courbes_vict_mec(df):
+@profiled
+def courbes_vict_mec(cube):
     st.header("Distribution of victims / implicated parties")
-    df_victimes = df[df['unité.de.compte'] == 'victime']
-    df_mis_en_cause = df[df['unité.de.compte'] == 'Mis en cause']
-
-    fig_victimes = px.bar(df_victimes, 
-                          x='Code.région', 
-                          y='faits', 
-                          color='classe', 
-                          title='Facts suffered by the victims',
-                          labels={'Code.région': 'Code de région', 'faits': 'Nombre de faits'},
-                          text='faits')
-    
-    st.plotly_chart(fig_victimes)
 
-    fig_mis_en_cause = px.bar(df_mis_en_cause, 
-                              x='Code.région', 
-                              y='faits', 
-                              color='classe', 
-                              title='Facts performed by the accused',
-                              labels={'Code.région': 'Code de région', 'faits': 'Nombre de faits'},
-                              text='faits')
+    # the bars of one year, or of all the years summed, per region and classe
+    years = cube.coordinates('annee')
+    year_selected = st.selectbox("Select the year of the facts :", [None] + list(years), index=len(years),
+                                 format_func=lambda year: 'All years' if year is None else str(year))
 
-    st.plotly_chart(fig_mis_en_cause)
+    for unit, title in VICT_MEC_CHARTS:
+        fig = cached_chart('courbes_vict_mec', cube, unit=unit, title=title, year=year_selected)
+        st.plotly_chart(fig)
     st.markdown("""
     In this analysis, I have separated the data into two distinct graphs: one for the **accused** and another for the **victims** in relation to the crimes committed. 
     The data reveals a concerning trend: individuals recorded as victims have suffered from various serious offenses, including homicides, 
@@ -238,37 +267,24 @@ def courbes_vict_mec(df):
     the complexities surrounding crime and victimization in society.
     """)
 
-def map_taux_crim(df, gdf):
+@profiled
+def map_taux_crim(cube, store):
     st.header("Map with Crime rate.")
-    df['pourcentage_criminalite'] = (df['faits'] / df['POP']) * 100
 
-    df['Code.région'] = df['Code.région'].astype(str)
-    gdf['code'] = gdf['code'].astype(str)
-
-    merged = gdf.merge(df, left_on='code', right_on='Code.région', how='left')
-
-    if merged.geometry.geom_type.iloc[0] != 'Point':
-        merged['centroid'] = merged.geometry.centroid
-        lat = merged.centroid.y
-        lon = merged.centroid.x
+    classe_selected = st.selectbox("Select the fact :", cube.coordinates('classe'), key='map_taux_crim_classe')
+    years = cube.coordinates('annee')
+    year_selected = st.select_slider("Select the year :", options=years, value=years[-1])
+    backend = st.radio("Map backend :", MAP_BACKENDS, horizontal=True, key='map_taux_crim_backend')
+
+    # the map only depends on the data of its year
+    if backend == 'Deck.gl':
+        deck = cached_figure('map_taux_crim', (BUILDER_VERSION, cube.version_for([year_selected]), store.version,
+                                               classe_selected, year_selected, backend),
+                             lambda: build_crime_rate_deck(cube, store, classe_selected, year_selected))
+        st.pydeck_chart(deck)
     else:
-        lat = merged.geometry.y
-        lon = merged.geometry.x
-
-    fig = px.scatter_mapbox(
-        merged,
-        lat=lat,
-        lon=lon,
-        size='pourcentage_criminalite', 
-        color='pourcentage_criminalite',  
-        color_continuous_scale=px.colors.sequential.Viridis,  
-        size_max=15,  
-        zoom=5,
-        mapbox_style="open-street-map",
-        range_color=[0, 2]  
-    )
-
-    st.plotly_chart(fig)
+        fig = cached_chart('map_taux_crim', cube, store, classe_selected=classe_selected, year_selected=year_selected)
+        st.plotly_chart(fig)
 
     st.markdown("""
     The crime rate map visually represents the levels of criminal activity across different regions, utilizing a color gradient 
@@ -282,6 +298,9 @@ def map_taux_crim(df, gdf):
     """)
 
 def dynamic_visualization(df):
+    # matplotlib is only loaded if this view is used
+    import matplotlib.pyplot as plt
+
     st.header("Pie chart view of facts by region")
 
     regions = df['Code.région'].unique()
@@ -312,58 +331,14 @@ def dynamic_visualization(df):
         ax.legend()
         st.pyplot(fig)
 
-def dynamic_plot(df):
-   
-    fig = go.Figure()
-
-    years = sorted(df['annee'].unique())
-    regions = df['Code.région'].unique()
-
-    for year in years:
-        filtered_df = df[df['annee'] == year].groupby('Code.région').agg({'faits': 'sum'}).reset_index()
-        filtered_df = filtered_df.sort_values('Code.région')
-
-        fig.add_trace(
-            go.Scatter(
-                visible=False,
-                line=dict(color='#4682B4', width=3),
-                name=f"Année: {year}",
-                x=filtered_df['Code.région'],
-                y=filtered_df['faits'],
-                mode='lines+markers',
-                hovertemplate='Région: %{x}<br>Total des Faits: %{y}'
-            )
-        )
-
-    fig.data[0].visible = True
-
-    steps = []
-    for i in range(len(fig.data)):
-        step = dict(
-            method="update",
-            args=[{"visible": [False] * len(fig.data)},
-                  {"title": f"Data for the year: {years[i]}"}],  
-        )
-        step["args"][0]["visible"][i] = True
-        steps.append(step)
-
-    sliders = [dict(
-        active=0, 
-        currentvalue={"prefix": "Année: "},
-        pad={"t": 50},
-        steps=steps
-    )]
-
-    fig.update_layout(
-        sliders=sliders,
-        xaxis_title="Code Région",
-        yaxis_title="Number of Crimes",
-        template="plotly_white"
-    )
+@profiled
+def dynamic_plot(cube):
 
+    fig = cached_chart('dynamic_plot', cube)
     st.plotly_chart(fig)
 
-def ensemble_viz_faits_region(df):
+@profiled
+def ensemble_viz_faits_region(cube):
     
     st.header('Visualization of the number of crimes in each region by age')
 
@@ -376,123 +351,13 @@ def ensemble_viz_faits_region(df):
     Understanding these dynamics is essential for crafting targeted interventions that address 
     the root causes of delinquency, ultimately fostering safer communities for all.
     """)
-    df_agg = df.groupby(['annee', 'Code.région'], as_index=False).agg({
-        'faits': 'sum',  
-        'POP': 'mean'  
-    })
-
     selection = st.radio(
         "Select the visualization :",
         ("Scatter", "Bar", "Chart")
     )
 
-    if selection == 'Scatter':
-        fig = px.scatter(
-            df_agg, 
-            x="Code.région", 
-            y="faits", 
-            animation_frame="annee", 
-            size="faits", 
-            color="Code.région", 
-            hover_name="Code.région", 
-            size_max=20, 
-            range_y=[0, max(df_agg['faits']) + 10]
-        )
-        st.plotly_chart(fig)
-    elif selection == 'Bar':
-        fig = px.bar(
-            df_agg, 
-            x="Code.région", 
-            y="faits", 
-            color="Code.région", 
-            animation_frame="annee", 
-            range_y=[0, max(df_agg['faits']) + 100000] 
-        )
+    if selection == 'Chart':
+        dynamic_plot(cube)
+    else:
+        fig = cached_chart('ensemble_viz_faits_region', cube, selection=selection)
         st.plotly_chart(fig)
-    elif selection == 'Chart':
-        dynamic_plot(df)  
-
-# ------------------ MY PROFIL -------------------- #
-
-
-def parcours_aca():
-    data_gantt = {
-    'Task': ["High School: L'Espérance", "EFREI Paris", "Internship M1: Innowide", "Internship M2: ???"],
-    'Début': ["2018-09-01", "2021-09-01", "2024-11-04", "2026-04-01"],
-    'Fin': ["2021-06-30", "2026-06-30", "2025-03-28", "2026-08-30"],
-    'Couleur': ['#FF6347', '#1E90FF', '#32CD32', '#FFD700']
-    }
-
-    df_gantt = pd.DataFrame(data_gantt)
-
-    
-    fig_gantt = px.timeline(df_gantt, x_start="Début", x_end="Fin", y="Task",
-                            title="My Academic Background",
-                            color='Task',  
-                            color_discrete_sequence=df_gantt['Couleur'])  
-
-    fig_gantt.update_yaxes(categoryorder="total ascending")  
-    fig_gantt.update_xaxes(type='date')
-
-    st.plotly_chart(fig_gantt)
-
-def repartition_competences():
-   
-    data_competences = {
-        'Compétences': ['Python', 'Machine Learning', 'Data Visualization', 'Database'],
-        'Pourcentage': [40, 30, 30, 20]
-    }
-
-    df_competences = pd.DataFrame(data_competences)
-
-    fig_pie = px.pie(df_competences, names='Compétences', values='Pourcentage',
-                    title="A little more about my technical skills ...")
-
-    st.plotly_chart(fig_pie)
-
-def wordcloud():
-
-    texte_interets = """
-    Sport, Intelligence Artificielle, Visualisation de données, Recherche, Technologie Générative, Projets, Innovation
-    """
-
-    wordcloud = WordCloud(width=800, height=400, background_color="white").generate(texte_interets)
-
-    st.write("My interests (using wordCloud)")
-    fig, ax = plt.subplots()
-    ax.imshow(wordcloud, interpolation='bilinear')
-    ax.axis("off")
-    st.pyplot(fig)
-
-def progression_ia():
-    data_progression = {
-        'Année': [ 2022, 2023, 2024, 2025],
-        'project': [1, 3, 4, 4]
-    }
-
-    df_progression = pd.DataFrame(data_progression)
-
-    fig_progression = px.line(df_progression, x='Année', y='project',
-                            title="Progress of my AI projects",
-                            markers=True)
-
-    st.plotly_chart(fig_progression)
-
-def passions_extra_scolaire():
-    data_passions = {
-        'Activités': ['Sport', 'Couture', 'Crochet', 'Peinture', 'Cuisine'],
-        'Engagement': [80, 60, 70, 50, 90] 
-    }
-
-    df_passions = pd.DataFrame(data_passions)
-
-    fig_radar = px.line_polar(df_passions, r='Engagement', theta='Activités', 
-                              line_close=True, title="My passions outside school", 
-                              range_r=[0, 100], 
-                              color_discrete_sequence=['#FF6347'])
-
-    fig_radar.update_traces(fill='toself')
-
-    st.plotly_chart(fig_radar)
-
-
@@ -0,0 +1,174 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from pyproj import CRS
+
+from data_store import file_signature, matches_signature, signature_metadata
+
+# Region geometry loaded once per process. The polygons are simplified at several levels so each
+# chart can ask for the resolution it needs instead of shipping the full 1.4 MB file to the browser.
+# The levels, centroids and bounds are kept in an Arrow file next to the geojson (the polygons as
+# WKB), memory-mapped by the other processes instead of reading and simplifying the file again.
+
+# tolerance in degrees for each level, 'full' is the geometry of the file
+SIMPLIFICATION_LEVELS = {
+    'full': 0,
+    'high': 0.001,
+    'medium': 0.005,
+    'low': 0.02,
+}
+
+# Lambert-93, used to compute the centroids in a projected CRS
+PROJECTED_CRS = 'EPSG:2154'
+
+
+class RegionIndex:
+    # region code -> integer position in the arrays of the store, so that joining facts to the
+    # geometry is a take on precomputed arrays instead of a merge of frames
+
+    def __init__(self, codes):
+        self.codes = pd.Index(codes)
+
+    def positions(self, codes):
+        # position of every code, -1 for the codes without geometry (overseas regions for instance).
+        # For categorical codes only the categories are looked up.
+        codes = pd.Series(codes, copy=False)
+        if isinstance(codes.dtype, pd.CategoricalDtype):
+            lookup = self.codes.get_indexer(codes.cat.categories.astype(str))
+            category_codes = codes.cat.codes.to_numpy()
+            return np.where(category_codes >= 0, lookup[category_codes], -1)
+        return self.codes.get_indexer(codes.astype(str))
+
+
+class GeometryStore:
+
+    def __init__(self, gdf, code_column='code', name_column='nom', version=None):
+        self.version = version
+        self.crs = gdf.crs
+        self.codes = gdf[code_column].astype(str).to_numpy()
+        self.index = RegionIndex(self.codes)
+        self.names = gdf[name_column].to_numpy() if name_column in gdf else self.codes.copy()
+
+        geometry = gdf.geometry.reset_index(drop=True)
+        self.levels = {}
+        for level, tolerance in SIMPLIFICATION_LEVELS.items():
+            if tolerance:
+                self.levels[level] = geometry.simplify(tolerance, preserve_topology=True)
+            else:
+                self.levels[level] = geometry
+
+        if self.crs is not None and self.crs.is_geographic:
+            centroids = geometry.to_crs(PROJECTED_CRS).centroid.to_crs(self.crs)
+        else:
+            centroids = geometry.centroid
+        # (n, 2) array of lon/lat and (n, 4) array of minx, miny, maxx, maxy, in the order of self.codes
+        self.centroids = np.column_stack([centroids.x.to_numpy(), centroids.y.to_numpy()])
+        self.bounds = geometry.bounds.to_numpy()
+        self._geojson = {}
+
+    @classmethod
+    def from_arrow(cls, table, version=None):
+        # store saved by to_arrow, the polygons are parsed from the WKB columns
+        metadata = table.schema.metadata
+        if json.loads(metadata[b'levels']) != SIMPLIFICATION_LEVELS:
+            raise ValueError('the geometry was simplified with other levels')
+        store = cls.__new__(cls)
+        store.version = version
+        store.crs = CRS.from_json(metadata[b'crs'].decode()) if metadata[b'crs'] else None
+        store.codes = table.column('code').to_numpy(zero_copy_only=False).astype(str)
+        store.index = RegionIndex(store.codes)
+        store.names = table.column('nom').to_numpy(zero_copy_only=False)
+        store.levels = {
+            level: gpd.GeoSeries(shapely.from_wkb(table.column(f'geometry_{level}').to_numpy(zero_copy_only=False)),
+                                 crs=store.crs)
+            for level in SIMPLIFICATION_LEVELS
+        }
+        store.centroids = np.column_stack([table.column(name).to_numpy() for name in ('x', 'y')])
+        store.bounds = np.column_stack([table.column(name).to_numpy() for name in ('minx', 'miny', 'maxx', 'maxy')])
+        store._geojson = {}
+        return store
+
+    def to_arrow(self, signature=None):
+        # `signature` is the one of the geojson the store was read from (see read_sidecar)
+        import pyarrow as pa
+
+        columns = {'code': self.codes, 'nom': self.names}
+        for level, geometry in self.levels.items():
+            columns[f'geometry_{level}'] = pa.array(shapely.to_wkb(np.asarray(geometry.values)), pa.binary())
+        columns.update(x=self.centroids[:, 0], y=self.centroids[:, 1])
+        columns.update(zip(('minx', 'miny', 'maxx', 'maxy'), self.bounds.T))
+        metadata = {'crs': self.crs.to_json() if self.crs is not None else '', 'levels': json.dumps(SIMPLIFICATION_LEVELS)}
+        if signature is not None:
+            metadata.update(signature_metadata(signature))
+        return pa.table(columns, metadata=metadata)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def positions(self, codes):
+        return self.index.positions(codes)
+
+    def geometry(self, level='full'):
+        return self.levels[level]
+
+    def frame(self, level='full'):
+        # GeoDataFrame with one row per region, like the one returned by gpd.read_file
+        return gpd.GeoDataFrame({'code': self.codes, 'nom': self.names},
+                                geometry=self.levels[level], crs=self.crs)
+
+    def geojson(self, level='medium'):
+        # FeatureCollection where the feature id is the region code, built once per level
+        if level not in self._geojson:
+            collection = json.loads(self.levels[level].to_json(drop_id=True))
+            for feature, code, name in zip(collection['features'], self.codes, self.names):
+                feature['id'] = code
+                feature['properties'] = {'code': code, 'nom': name}
+            self._geojson[level] = collection
+        return self._geojson[level]
+
+
+def sidecar_path(local_path):
+    return os.path.splitext(local_path)[0] + '.arrow'
+
+
+def read_sidecar(local_path, version=None):
+    # the store saved next to the geojson if it was built from the geojson as it is, None otherwise
+    path = sidecar_path(local_path)
+    try:
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        if not matches_signature(table.schema.metadata, local_path):
+            return None
+        return GeometryStore.from_arrow(table, version=version)
+    except (OSError, ImportError, ValueError, KeyError):
+        return None
+
+
+def write_sidecar(store, local_path, signature):
+    # written uncompressed and replaced atomically, like the sidecar of the data (see data_store.py)
+    path = sidecar_path(local_path)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    try:
+        import pyarrow as pa
+        table = store.to_arrow(signature)
+        with pa.OSFile(temporary, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temporary, path)
+    except (OSError, ImportError):
+        pass
+
+
+def read_geometry_store(local_path, version=None, sidecar=True):
+    if sidecar:
+        store = read_sidecar(local_path, version)
+        if store is not None:
+            return store
+
+    signature = file_signature(local_path)
+    store = GeometryStore(gpd.read_file(local_path), version=version)
+    if sidecar:
+        write_sidecar(store, local_path, signature)
+    return store
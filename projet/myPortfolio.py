@@ -1,12 +1,10 @@
-import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import folium
-from streamlit_folium import st_folium
 import base64
-from myProfile import *
-from DataVIz import *
+import io
+import os
+import streamlit as st
+from profiling import show_profiling_panel, start_rerun
+
+start_rerun()
 
 st.sidebar.markdown(
     """
@@ -30,12 +28,25 @@ st.sidebar.markdown(
 
 
 image_path = "./projet/photo_profil.png"
+# the picture is shown at 150 px, it is encoded at twice this size for the high density screens
+PROFILE_PICTURE_SIZE = 300
 
-# Convertir l'image en base64 pour l'inclure dans le HTML
+# Convertir l'image en base64 pour l'inclure dans le HTML, réduite et encodée une seule fois
+# tant que le fichier ne change pas
 def get_base64_image(image_path):
-    with open(image_path, "rb") as image_file:
-        encoded_image = base64.b64encode(image_file.read()).decode()
-    return encoded_image
+    return _encode_image(image_path, os.stat(image_path).st_mtime_ns)
+
+# a single picture, the encoding of its previous version is dropped when it changes
+@st.cache_data(show_spinner=False, max_entries=1)
+def _encode_image(image_path, mtime):
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        image = image.convert("RGB")
+        image.thumbnail((PROFILE_PICTURE_SIZE, PROFILE_PICTURE_SIZE))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+    return base64.b64encode(buffer.getvalue()).decode()
 
 # Afficher la photo de profil dans la barre latérale
 with st.sidebar:
@@ -43,7 +54,7 @@ with st.sidebar:
     st.markdown(
         f"""
         <div class="profile-pic-container">
-            <img src="data:image/png;base64,{image_base64}" class="profile-pic">
+            <img src="data:image/jpeg;base64,{image_base64}" class="profile-pic">
         </div>
         """,
         unsafe_allow_html=True
@@ -60,8 +71,13 @@ Constance Walusiak
 # Sélection de la page
 page = st.sidebar.selectbox("Select the page", ["Biographie", "Visualisation"])
 
-# Affichage de la page correspondante
+# Affichage de la page correspondante, chaque page importe ses bibliothèques à sa première ouverture
 if page == "Biographie":
+    from myProfile import page_biographie
     page_biographie()
 else:
+    from DataVIz import page_data_visualisation
     page_data_visualisation()
+
+# mesures de cette exécution dans la barre latérale, seulement avec PORTFOLIO_PROFILE=1
+show_profiling_panel()
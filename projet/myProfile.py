@@ -1,6 +1,8 @@
 import streamlit as st
-from functions import *
+from profile_functions import *
+from profiling import profiled
 # In this page, I have some resume of me with my curriculum
+@profiled
 def page_biographie():
 
     st.title("🌟 My Portfolio - Constance WALUSIAK 🌟")
@@ -12,8 +14,7 @@ def page_biographie():
   
     cv_file_path = "./projet/CV_WALUSIAK_CONSTANCE.pdf"  
 
-    with open(cv_file_path, "rb") as cv_file:
-        cv_data = cv_file.read()
+    cv_data = read_static_file(cv_file_path)
 
     st.download_button(
         label="Download my curriculum",
@@ -0,0 +1,251 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cube import FactCube, aggregate_facts, combine_aggregates, stream_cube
+from data_store import DTYPES, file_signature, peak_rss, read_csv_chunks, read_regional_data
+
+# Data partitioned by year (annee) on disk, with the aggregates of the cube stored per year:
+#
+#   partitions/manifest.json            hash, rows and source of every year, signature, rank and
+#                                       years of every source file
+#   partitions/annee=16/data.parquet    rows of the year
+#   partitions/annee=16/cube.parquet    output of cube.aggregate_facts for the year
+#
+# A refresh skips the source files that did not change since the last refresh, and only writes
+# and aggregates the years whose content changed, so adding a yearly release costs the size of
+# the release. When the same year is found in several sources, the source registered last (the
+# most recent release) wins, whatever the order in which they are refreshed. A year that
+# disappears from its source is removed, or taken again from the next source that has it.
+
+MANIFEST = 'manifest.json'
+# manifests written with another format are rebuilt from the sources
+MANIFEST_FORMAT = 2
+TEXT_COLUMNS = ('Code.région', 'classe', 'unité.de.compte')
+# when the partitions cannot be written, above this size the cube is built by reading the csv by
+# chunks (commune or département files) instead of loading it
+STREAMING_THRESHOLD = 50 * 1024 * 1024
+# the sessions of the app refresh the same partitions, one at a time
+_refresh_lock = threading.Lock()
+
+
+class PartitionStore:
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest = self._read_manifest()
+        # rows, seconds, rows_per_second and peak_rss of the last refresh that read a source
+        self.ingestion = None
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get('format') == MANIFEST_FORMAT:
+                return manifest
+        except FileNotFoundError:
+            pass
+        return {'format': MANIFEST_FORMAT, 'years': {}, 'sources': {}}
+
+    def _write_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2, sort_keys=True)
+        os.replace(temporary, path)
+
+    def _partition(self, year):
+        return os.path.join(self.directory, f'annee={year}')
+
+    @property
+    def years(self):
+        return sorted(int(year) for year in self.manifest['years'])
+
+    def year_versions(self):
+        return {int(year): entry['hash'] for year, entry in self.manifest['years'].items()}
+
+    def _rank(self, source):
+        return self.manifest['sources'][source]['rank'] if source in self.manifest['sources'] else -1
+
+    def refresh(self, sources, chunksize=500_000, progress=None):
+        # Ingests the source csv files that changed since the last refresh and returns the
+        # years whose partition was rewritten or removed. The sources are read by chunks,
+        # progress(fraction, rows) is called after every chunk (see data_store.read_csv_chunks).
+        os.makedirs(self.directory, exist_ok=True)
+        changed = set()
+        start = time.perf_counter()
+        self._rows = 0
+        for source in sources:
+            source = os.path.abspath(source)
+            signature = list(file_signature(source))
+            entry = self.manifest['sources'].get(source)
+            if entry is not None and entry['signature'] == signature:
+                continue
+            if entry is None:
+                # the precedence of a source is fixed when it is first seen
+                rank = max((entry['rank'] for entry in self.manifest['sources'].values()), default=-1) + 1
+                entry = self.manifest['sources'][source] = {'rank': rank, 'years': []}
+            years_changed, years = self._ingest(source, chunksize, progress)
+            changed |= years_changed
+            removed = set(entry['years']) - set(years)
+            entry.update(signature=signature, years=sorted(years))
+            changed |= self._remove_years(source, removed, chunksize)
+            self._write_manifest()
+
+        if self._rows:
+            seconds = time.perf_counter() - start
+            self.ingestion = {
+                'rows': self._rows,
+                'seconds': seconds,
+                'rows_per_second': self._rows / seconds if seconds else None,
+                'peak_rss': peak_rss(),
+            }
+        return sorted(changed)
+
+    def _remove_years(self, source, years, chunksize):
+        # years no longer in `source`: their partition is dropped, then taken again from the
+        # source of highest precedence that still has them
+        changed = set()
+        for year in years:
+            if self.manifest['years'].get(str(year), {}).get('source') != source:
+                continue
+            shutil.rmtree(self._partition(year), ignore_errors=True)
+            del self.manifest['years'][str(year)]
+            changed.add(year)
+            others = [other for other, entry in self.manifest['sources'].items()
+                      if other != source and year in entry['years'] and os.path.exists(other)]
+            if others:
+                self._ingest(max(others, key=self._rank), chunksize)
+        return changed
+
+    def _ingest(self, source, chunksize, progress=None):
+        # The rows of each year are written to a temporary partition while the file is read by
+        # chunks, then the partitions with a new hash replace the previous ones, except the years
+        # held by a source of higher precedence. Returns the years rewritten and all the years
+        # of the source.
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.staging-')
+        writers, hashes, aggregates, rows = {}, {}, {}, {}
+        try:
+            for chunk in read_csv_chunks(source, chunksize, progress):
+                self._rows += len(chunk)
+                for year, part in chunk.groupby('annee', sort=False):
+                    year = int(year)
+                    part = part.astype({column: str for column in TEXT_COLUMNS})
+                    table = pa.Table.from_pandas(part, preserve_index=False)
+                    if year not in writers:
+                        os.makedirs(os.path.join(staging, f'annee={year}'))
+                        writers[year] = pq.ParquetWriter(os.path.join(staging, f'annee={year}', 'data.parquet'),
+                                                         table.schema)
+                        hashes[year] = hashlib.sha1()
+                    writers[year].write_table(table)
+                    hashes[year].update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+                    part_aggregates = aggregate_facts(part)
+                    aggregates[year] = (part_aggregates if year not in aggregates
+                                        else combine_aggregates(aggregates[year], part_aggregates))
+                    rows[year] = rows.get(year, 0) + len(part)
+            for writer in writers.values():
+                writer.close()
+
+            changed = set()
+            for year, digest in hashes.items():
+                entry = {'hash': digest.hexdigest(), 'rows': rows[year], 'source': source}
+                current = self.manifest['years'].get(str(year))
+                if current == entry:
+                    continue
+                if current is not None and self._rank(current['source']) > self._rank(source):
+                    continue
+                aggregates[year].to_parquet(os.path.join(staging, f'annee={year}', 'cube.parquet'), index=False)
+                shutil.rmtree(self._partition(year), ignore_errors=True)
+                os.replace(os.path.join(staging, f'annee={year}'), self._partition(year))
+                self.manifest['years'][str(year)] = entry
+                changed.add(year)
+            return changed, set(hashes)
+        finally:
+            for writer in writers.values():
+                writer.close()
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def read_data(self, years=None):
+        # rows of the given years (all by default) with the types of data_store.DTYPES
+        frames = [pd.read_parquet(os.path.join(self._partition(year), 'data.parquet'))
+                  for year in (years or self.years)]
+        return pd.concat(frames, ignore_index=True).astype(DTYPES)
+
+    def cube(self):
+        # cube built from the stored aggregates of every year, nothing is read from the sources.
+        # The version of the cube is the hash of all the years, cube.year_versions has the hash of each.
+        frames = [pd.read_parquet(os.path.join(self._partition(year), 'cube.parquet')) for year in self.years]
+        grouped = pd.concat(frames, ignore_index=True).astype({'Code.région': str})
+        versions = self.year_versions()
+        version = hashlib.sha1(json.dumps(sorted(versions.items())).encode()).hexdigest()
+        cube = FactCube(grouped, version=version)
+        cube.year_versions = versions
+        return cube
+
+
+def partitions_directory(filepath):
+    # the partitions of a csv are stored next to it
+    return os.path.join(os.path.dirname(filepath), 'partitions')
+
+
+def manifest_hash(filepath):
+    # hash of the manifest of the partitions of a csv, None when there is none. It changes when
+    # a release is ingested with the command line, so the app builds its cube again.
+    try:
+        with open(os.path.join(partitions_directory(filepath), MANIFEST), 'rb') as manifest_file:
+            return hashlib.sha1(manifest_file.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def refresh_partitions(filepath, progress=None):
+    # refreshes the partitions next to a csv (nothing is read when it did not change) and returns
+    # the store, None when the partitions cannot be written
+    try:
+        with _refresh_lock:
+            partitions = PartitionStore(partitions_directory(filepath))
+            partitions.refresh([filepath], progress=progress)
+        return partitions
+    except OSError:
+        return None
+
+
+def read_cube(filepath, progress=None, data=None):
+    # Cube of a csv as used by the app (and the figure warm-up, which must get the same version):
+    # assembled from the yearly partitions next to the csv, which only re-aggregate the years that
+    # changed and hold the releases ingested with the command line. When the partitions cannot be
+    # written, the cube is streamed from the big files, else built from `data` (by default the
+    # csv is read).
+    partitions = refresh_partitions(filepath, progress)
+    if partitions is not None:
+        cube = partitions.cube()
+        cube.ingestion = partitions.ingestion
+        return cube
+    signature = file_signature(filepath)
+    if signature[1] > STREAMING_THRESHOLD:
+        return stream_cube(filepath, progress=progress, version=signature)
+    df = data() if data is not None else read_regional_data(filepath)
+    return FactCube.from_frame(df, version=signature)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the yearly partitions from csv files')
+    parser.add_argument('sources', nargs='+', help='csv files, e.g. the full base then the new releases')
+    parser.add_argument('--store', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'partitions'))
+    args = parser.parse_args()
+
+    store = PartitionStore(args.store)
+    changed = store.refresh(args.sources)
+    print(f"years refreshed: {changed or 'none'}, years stored: {store.years}")
+
+
+if __name__ == '__main__':
+    main()
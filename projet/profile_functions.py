@@ -0,0 +1,130 @@
+import io
+import os
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from profiling import profiled
+
+# Charts of the Biographie page, kept apart from functions.py so that this page does not load
+# the data and geometry stack of the Visualisation page.
+# Everything on this page is built from constants or static files, so each figure, the wordcloud
+# image and the CV are built once per process with st.cache_resource and shared by all the
+# visitors; the files are keyed on their signature so a new CV or picture is picked up.
+
+# ------------------ MY PROFIL -------------------- #
+
+
+@profiled
+def read_static_file(path):
+    # content of a file of the page, read again only when the file changes
+    stat = os.stat(path)
+    return _read_static_file(path, (stat.st_mtime_ns, stat.st_size))
+
+# one file is read (the CV), the entry of its previous version is dropped when it changes
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _read_static_file(path, signature):
+    with open(path, "rb") as static_file:
+        return static_file.read()
+
+@profiled
+def parcours_aca():
+    st.plotly_chart(_parcours_aca_figure())
+
+@st.cache_resource(show_spinner=False)
+def _parcours_aca_figure():
+    data_gantt = {
+    'Task': ["High School: L'Espérance", "EFREI Paris", "Internship M1: Innowide", "Internship M2: ???"],
+    'Début': ["2018-09-01", "2021-09-01", "2024-11-04", "2026-04-01"],
+    'Fin': ["2021-06-30", "2026-06-30", "2025-03-28", "2026-08-30"],
+    'Couleur': ['#FF6347', '#1E90FF', '#32CD32', '#FFD700']
+    }
+
+    df_gantt = pd.DataFrame(data_gantt)
+
+    
+    fig_gantt = px.timeline(df_gantt, x_start="Début", x_end="Fin", y="Task",
+                            title="My Academic Background",
+                            color='Task',  
+                            color_discrete_sequence=df_gantt['Couleur'])  
+
+    fig_gantt.update_yaxes(categoryorder="total ascending")  
+    fig_gantt.update_xaxes(type='date')
+    return fig_gantt
+
+@profiled
+def repartition_competences():
+    st.plotly_chart(_repartition_competences_figure())
+
+@st.cache_resource(show_spinner=False)
+def _repartition_competences_figure():
+    data_competences = {
+        'Compétences': ['Python', 'Machine Learning', 'Data Visualization', 'Database'],
+        'Pourcentage': [40, 30, 30, 20]
+    }
+
+    df_competences = pd.DataFrame(data_competences)
+
+    fig_pie = px.pie(df_competences, names='Compétences', values='Pourcentage',
+                    title="A little more about my technical skills ...")
+    return fig_pie
+
+@profiled
+def wordcloud():
+
+    texte_interets = """
+    Sport, Intelligence Artificielle, Visualisation de données, Recherche, Technologie Générative, Projets, Innovation
+    """
+
+    st.write("My interests (using wordCloud)")
+    st.image(_wordcloud_png(texte_interets, 800, 400))
+
+@st.cache_resource(show_spinner=False)
+def _wordcloud_png(texte, width, height):
+    # the wordcloud is rendered once as a PNG image, without matplotlib
+    from wordcloud import WordCloud
+
+    image = WordCloud(width=width, height=height, background_color="white").generate(texte).to_image()
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@profiled
+def progression_ia():
+    st.plotly_chart(_progression_ia_figure())
+
+@st.cache_resource(show_spinner=False)
+def _progression_ia_figure():
+    data_progression = {
+        'Année': [ 2022, 2023, 2024, 2025],
+        'project': [1, 3, 4, 4]
+    }
+
+    df_progression = pd.DataFrame(data_progression)
+
+    fig_progression = px.line(df_progression, x='Année', y='project',
+                            title="Progress of my AI projects",
+                            markers=True)
+    return fig_progression
+
+@profiled
+def passions_extra_scolaire():
+    st.plotly_chart(_passions_extra_scolaire_figure())
+
+@st.cache_resource(show_spinner=False)
+def _passions_extra_scolaire_figure():
+    data_passions = {
+        'Activités': ['Sport', 'Couture', 'Crochet', 'Peinture', 'Cuisine'],
+        'Engagement': [80, 60, 70, 50, 90] 
+    }
+
+    df_passions = pd.DataFrame(data_passions)
+
+    fig_radar = px.line_polar(df_passions, r='Engagement', theta='Activités', 
+                              line_close=True, title="My passions outside school", 
+                              range_r=[0, 100], 
+                              color_discrete_sequence=['#FF6347'])
+
+    fig_radar.update_traces(fill='toself')
+    return fig_radar
+
+
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from functools import wraps
+import numpy as np
+
+# Profiling of the loaders and chart functions of the app, off by default:
+#
+#   PORTFOLIO_PROFILE=1 streamlit run projet/myPortfolio.py
+#
+# When it is off, `profiled` returns the functions unchanged, so it costs nothing. When it is on,
+# every call of a profiled function records its wall time, CPU time (of the thread running the
+# session), net allocated memory (tracemalloc), rows of the result and size of the serialized
+# figure. The calls of the current rerun and the p50/p95 of the last WINDOW calls of each function
+# are shown in the sidebar, every call is appended to PORTFOLIO_PROFILE_DIR/profile.jsonl and the
+# rolling stats are written to PORTFOLIO_PROFILE_DIR/profile.prom (Prometheus text format).
+
+ENABLED = os.environ.get('PORTFOLIO_PROFILE', '').lower() in ('1', 'true', 'yes')
+OUTPUT_DIR = os.environ.get('PORTFOLIO_PROFILE_DIR', 'profile')
+# number of calls per function kept for the rolling stats
+WINDOW = 200
+METRICS = ('wall_seconds', 'cpu_seconds', 'alloc_bytes', 'rows', 'figure_bytes')
+
+
+def _size(result):
+    # (rows, serialized bytes) of the result of a profiled function, None when it does not apply
+    if result is None:
+        return None, None
+    if isinstance(result, (bytes, str)):
+        return None, len(result)
+    if hasattr(result, 'to_json') and not hasattr(result, 'shape'):
+        # plotly figures and pydeck decks, as sent to the browser
+        return None, len(result.to_json())
+    if isinstance(getattr(result, 'counts', None), np.ndarray):
+        # FactCube: rows of the data it aggregates
+        return int(result.counts.sum()), None
+    if hasattr(result, '__len__'):
+        return len(result), None
+    return None, None
+
+
+class Profiler:
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.calls = {}
+        self._lock = threading.Lock()
+        # each streamlit session reruns the script in its own thread
+        self._rerun = threading.local()
+
+    def start_rerun(self):
+        self._rerun.records = []
+        self._rerun.depth = 0
+
+    def rerun_records(self):
+        return [record for record in getattr(self._rerun, 'records', []) if record is not None]
+
+    def call(self, name, function, *args, **kwargs):
+        depth = getattr(self._rerun, 'depth', 0)
+        self._rerun.depth = depth + 1
+        # the record takes its place in the rerun when the call starts, before the nested calls
+        records = getattr(self._rerun, 'records', None)
+        if records is not None:
+            slot = len(records)
+            records.append(None)
+        memory = tracemalloc.get_traced_memory()[0]
+        cpu = time.thread_time()
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            self._rerun.depth = depth
+        wall = time.perf_counter() - start
+        cpu = time.thread_time() - cpu
+        memory = tracemalloc.get_traced_memory()[0] - memory
+
+        rows, figure_bytes = _size(result)
+        record = {'time': time.time(), 'function': name, 'depth': depth, 'wall_seconds': wall, 'cpu_seconds': cpu,
+                  'alloc_bytes': memory, 'rows': rows, 'figure_bytes': figure_bytes}
+        with self._lock:
+            self.calls.setdefault(name, deque(maxlen=self.window)).append(record)
+        if records is not None:
+            records[slot] = record
+        return result
+
+    def stats(self):
+        # p50/p95 of every metric over the last calls of each function
+        with self._lock:
+            calls = {name: list(records) for name, records in self.calls.items()}
+        rows = []
+        for name, records in sorted(calls.items()):
+            row = {'function': name, 'calls': len(records)}
+            for metric in METRICS:
+                values = [record[metric] for record in records if record[metric] is not None]
+                if values:
+                    row[f'{metric}_p50'], row[f'{metric}_p95'] = np.percentile(values, [50, 95]).tolist()
+            rows.append(row)
+        return rows
+
+    def export(self, directory=OUTPUT_DIR):
+        # appends the calls of this rerun to profile.jsonl and rewrites profile.prom
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'profile.jsonl'), 'a') as jsonl:
+            for record in self.rerun_records():
+                jsonl.write(json.dumps(record) + '\n')
+
+        lines = []
+        stats = self.stats()
+        for metric in METRICS:
+            lines.append(f'# HELP portfolio_{metric} {metric} of the profiled functions over their last {self.window} calls')
+            lines.append(f'# TYPE portfolio_{metric} summary')
+            for row in stats:
+                if f'{metric}_p50' not in row:
+                    continue
+                for quantile in ('p50', 'p95'):
+                    lines.append(f'portfolio_{metric}{{function="{row["function"]}",quantile="0.{quantile[1:]}"}} '
+                                 f'{row[f"{metric}_{quantile}"]}')
+                lines.append(f'portfolio_{metric}_count{{function="{row["function"]}"}} {row["calls"]}')
+        path = os.path.join(directory, 'profile.prom')
+        with open(path + '.tmp', 'w') as prom:
+            prom.write('\n'.join(lines) + '\n')
+        os.replace(path + '.tmp', path)
+
+
+PROFILER = Profiler()
+if ENABLED:
+    tracemalloc.start()
+
+
+def profiled(function=None, name=None):
+    # @profiled or profiled(name=...)(function): the function itself when profiling is off
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            return PROFILER.call(name or function.__name__, function, *args, **kwargs)
+        return wrapper
+
+    return decorate(function) if function is not None else decorate
+
+
+def start_rerun():
+    if ENABLED:
+        PROFILER.start_rerun()
+
+
+def show_profiling_panel():
+    # calls of this rerun and rolling stats in the sidebar, then the export; nothing when off
+    if not ENABLED:
+        return
+    import pandas as pd
+    import streamlit as st
+
+    records = PROFILER.rerun_records()
+    with st.sidebar.expander("Profiling", expanded=False):
+        st.write("This rerun")
+        table = pd.DataFrame(records, columns=['function', 'depth'] + list(METRICS))
+        table['function'] = ['  ' * depth + function for function, depth in zip(table['function'], table['depth'])]
+        st.dataframe(table.drop(columns='depth'), hide_index=True)
+        st.write(f"Last {PROFILER.window} calls of each function")
+        st.dataframe(pd.DataFrame(PROFILER.stats()), hide_index=True)
+    PROFILER.export()
@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import os
+import time
+import numpy as np
+import pandas as pd
+import shapely
+
+from cube import MEASURES
+from data_store import CSV_OPTIONS, peak_rss
+
+# Spatial join of geolocated rows (incidents with a longitude and a latitude, or the centroids of
+# communes) onto the regions of a geometry store, so that they can be aggregated like the regional
+# data and drawn by plot_mapbox and map_taux_crim.
+#
+# The points are assigned by batches: the STRtree of the region polygons gives the candidate
+# (point, region) pairs from the bounding boxes, then shapely.intersects_xy tests all the pairs at
+# once against the prepared polygons (a point on the border of a region is in it). The region codes
+# of a file are kept in a parquet file next to it, and only computed again when the file or the
+# regions change.
+
+BATCH_SIZE = 1_000_000
+# a file of geolocated incidents has the columns longitude, latitude, classe and annee, and
+# optionally unité.de.compte (DEFAULT_UNIT when missing) and faits (a weight, 1 when missing)
+POINT_DTYPES = {'classe': 'category', 'unité.de.compte': 'category', 'annee': 'int16'}
+DEFAULT_UNIT = 'faits'
+
+
+class RegionAssigner:
+
+    def __init__(self, store, level='full'):
+        self.store = store
+        self.level = level
+        self.geometries = np.asarray(store.geometry(level).values)
+        # preparing the polygons indexes their edges, intersects_xy is then logarithmic per point
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+    def positions(self, longitude, latitude, batch_size=BATCH_SIZE):
+        # position in the store of the region containing each point, -1 outside every region.
+        # A point on a border shared by two regions goes to the first one of the store.
+        longitude = np.asarray(longitude, dtype=float)
+        latitude = np.asarray(latitude, dtype=float)
+        positions = np.full(len(longitude), -1, dtype=np.int32)
+        for start in range(0, len(longitude), batch_size):
+            x = longitude[start:start + batch_size]
+            y = latitude[start:start + batch_size]
+            points, regions = self.tree.query(shapely.points(x, y))
+            inside = shapely.intersects_xy(self.geometries[regions], x[points], y[points])
+            points, regions = points[inside], regions[inside]
+            order = np.lexsort((regions, points))
+            points, first = np.unique(points[order], return_index=True)
+            positions[start + points] = regions[order][first]
+        return positions
+
+    def codes(self, longitude, latitude, batch_size=BATCH_SIZE):
+        # region codes of the points as a categorical, NaN outside every region
+        positions = self.positions(longitude, latitude, batch_size)
+        return pd.Categorical.from_codes(positions, categories=pd.Index(self.store.codes))
+
+
+def assign_centroids(communes, regions, level='full'):
+    # region of every commune (or any smaller area) of the store `communes`, from its centroid:
+    # frame with the code of the commune and its Code.région
+    codes = RegionAssigner(regions, level).codes(communes.centroids[:, 0], communes.centroids[:, 1])
+    return pd.DataFrame({'code': communes.codes, 'Code.région': codes})
+
+
+def assignment_path(source, store, level='full'):
+    # the region codes of a file depend on the file, on the version of the regions and on the
+    # predicate (the files assigned with contains_xy left the points on the borders out)
+    key = hashlib.sha1(repr((store.version, level, 'intersects')).encode()).hexdigest()[:12]
+    return f'{os.path.splitext(source)[0]}.regions-{key}.parquet'
+
+
+def assign_file(source, store, level='full', chunksize=BATCH_SIZE, read_options=None):
+    # region codes of every row of a csv of points, read from the cached assignment when it is
+    # more recent than the file. Only the coordinates are read, by chunks.
+    path = assignment_path(source, store, level)
+    try:
+        if os.stat(path).st_mtime_ns >= os.stat(source).st_mtime_ns:
+            return pd.read_parquet(path)['Code.région']
+    except (OSError, ImportError, ValueError):
+        pass
+
+    assigner = RegionAssigner(store, level)
+    options = dict(CSV_OPTIONS, **(read_options or {}))
+    positions = [
+        assigner.positions(chunk['longitude'].to_numpy(), chunk['latitude'].to_numpy())
+        for chunk in pd.read_csv(source, usecols=['longitude', 'latitude'], chunksize=chunksize, **options)
+    ]
+    positions = np.concatenate(positions) if positions else np.empty(0, dtype=np.int32)
+    codes = pd.Series(pd.Categorical.from_codes(positions, categories=pd.Index(store.codes)), name='Code.région')
+    try:
+        codes.to_frame().to_parquet(path, index=False)
+    except (OSError, ImportError):
+        pass
+    return codes
+
+
+def aggregate_points(points, codes, populations=None):
+    # Rows of the regional schema (see data_store.DTYPES) from geolocated incidents: the facts
+    # are the number of points (or the sum of their `faits` column) per classe, unit, year and
+    # region, and POP/LOG are taken from `populations` (e.g. the regional data) for the rates.
+    # The points outside every region are dropped.
+    frame = pd.DataFrame({
+        'classe': points['classe'],
+        'unité.de.compte': points['unité.de.compte'] if 'unité.de.compte' in points else DEFAULT_UNIT,
+        'annee': points['annee'],
+        'Code.région': pd.Series(pd.Categorical(codes), index=points.index),
+        'faits': points['faits'] if 'faits' in points else 1,
+    }).dropna(subset=['Code.région'])
+    keys = ['classe', 'unité.de.compte', 'annee', 'Code.région']
+    grouped = frame.groupby(keys, observed=True, sort=False)['faits'].sum().reset_index()
+    grouped['Code.région'] = grouped['Code.région'].astype(str)
+
+    if populations is None:
+        grouped['POP'] = 0
+        grouped['LOG'] = 0.0
+    else:
+        # every row of the regional data repeats the population of its region and year
+        population = populations.groupby(['annee', 'Code.région'], observed=True)[['POP', 'LOG']].max()
+        grouped = grouped.join(population, on=['annee', 'Code.région'])
+        grouped[['POP', 'LOG']] = grouped[['POP', 'LOG']].fillna(0)
+    return grouped[keys + list(MEASURES)]
+
+
+def main():
+    # assigns the points of a csv to the regions and prints the throughput, e.g.
+    #   python projet/spatial_join.py incidents.csv --sep , --decimal .
+    from geometry_store import read_geometry_store
+
+    parser = argparse.ArgumentParser(description='Assign the points of a csv file to the regions')
+    parser.add_argument('source', help="csv file with 'longitude' and 'latitude' columns")
+    parser.add_argument('--geojson', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regions.geojson'))
+    parser.add_argument('--sep', default=CSV_OPTIONS['sep'])
+    parser.add_argument('--decimal', default=CSV_OPTIONS['decimal'])
+    args = parser.parse_args()
+
+    store = read_geometry_store(args.geojson, version=os.stat(args.geojson).st_mtime_ns)
+    start = time.perf_counter()
+    codes = assign_file(args.source, store, read_options={'sep': args.sep, 'decimal': args.decimal})
+    seconds = time.perf_counter() - start
+    rss = peak_rss()
+    print(f"{len(codes):,} points in {seconds:.1f} s ({len(codes) / max(seconds, 1e-9):,.0f} points/s), "
+          f"{codes.notna().mean():.1%} inside a region" + (f", peak RSS {rss / 1024 ** 2:.0f} MB" if rss else ""))
+    print(codes.value_counts().to_string())
+
+
+if __name__ == '__main__':
+    main()
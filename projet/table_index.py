@@ -0,0 +1,120 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# Value indexes over the columns of a data frame, for the table explorer of the data page.
+# The index of a column is built the first time the column is filtered: the column is factorized
+# once and the row positions are sorted by value, so the rows of a value are a slice of that
+# order. A filter on several columns intersects the positions of each value, starting with the
+# smallest, and the displayed rows are sampled from the resulting positions, the data frame
+# itself is never scanned again.
+# The same indexes give the sort orders of the paged explorer: the rank of every row in the
+# sorted values of a column is computed once, and a page only takes the visible rows of the
+# visible columns out of the frame.
+
+
+class ColumnIndex:
+
+    def __init__(self, column):
+        codes, self.values = pd.factorize(column, use_na_sentinel=False)
+        self.codes = codes
+        self._ranks = None
+        # stable sort: the positions of each value stay in the order of the rows
+        self.order = np.argsort(codes, kind='stable')
+        self.starts = np.searchsorted(codes[self.order], np.arange(len(self.values) + 1))
+        self._lookup = {value: code for code, value in enumerate(self.values)}
+
+    def positions(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            return self.order[:0]
+        return self.order[self.starts[code]:self.starts[code + 1]]
+
+    def counts(self):
+        return pd.Series(np.diff(self.starts), index=self.values)
+
+    def ranks(self):
+        # rank of the value of every row among the sorted distinct values, equal values share it
+        if self._ranks is None:
+            value_order = pd.Index(self.values).argsort()
+            value_ranks = np.empty(len(value_order), dtype=np.int64)
+            value_ranks[value_order] = np.arange(len(value_order))
+            self._ranks = value_ranks[self.codes]
+        return self._ranks
+
+
+class TableIndex:
+
+    def __init__(self, df):
+        self.df = df
+        self._columns = {}
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def columns(self):
+        return self.df.columns.tolist()
+
+    def column(self, name):
+        # index of a column, built on first use and shared by every session afterwards
+        with self._lock:
+            if name not in self._columns:
+                self._columns[name] = ColumnIndex(self.df[name])
+            return self._columns[name]
+
+    def values(self, name):
+        # distinct values of a column, in order of first appearance like Series.unique
+        return self.column(name).values.tolist()
+
+    def positions(self, filters):
+        # row positions matching every {column: value} of `filters`, sorted
+        if not filters:
+            return np.arange(len(self.df))
+        matches = sorted((self.column(name).positions(value) for name, value in filters.items()), key=len)
+        positions = matches[0]
+        for other in matches[1:]:
+            if len(positions) == 0:
+                break
+            positions = np.intersect1d(positions, other, assume_unique=True)
+        return positions
+
+    def count(self, name, value):
+        return len(self.column(name).positions(value))
+
+    def order(self, name, descending=False):
+        # positions of all the rows sorted by a column, equal values keep the order of the table
+        index = self.column(name)
+        with self._lock:
+            if (name, descending) not in self._orders:
+                ranks = index.ranks()
+                self._orders[name, descending] = np.argsort(-ranks if descending else ranks, kind='stable')
+            return self._orders[name, descending]
+
+    def sort(self, positions, name, descending=False):
+        # `positions` sorted by a column: a few rows are sorted on their ranks, a large part of
+        # the table is taken in the precomputed order of the column
+        order = self.order(name, descending)
+        if len(positions) == len(self.df):
+            return order
+        if len(positions) < len(self.df) // 16:
+            ranks = self.column(name).ranks()[positions]
+            return positions[np.argsort(-ranks if descending else ranks, kind='stable')]
+        selected = np.zeros(len(self.df), dtype=bool)
+        selected[positions] = True
+        return order[selected[order]]
+
+    def page(self, positions, number, size, columns=None):
+        # rows of page `number` (from 0) of `positions`, only the visible cells are copied
+        rows = positions[number * size:(number + 1) * size]
+        if columns is None:
+            return self.df.iloc[rows]
+        return self.df.iloc[rows, self.df.columns.get_indexer(columns)]
+
+    def sample(self, positions, n, columns=None, random_state=None):
+        # up to n rows drawn among `positions`, in the order of the table
+        rng = np.random.default_rng(random_state)
+        chosen = np.sort(rng.choice(positions, size=min(n, len(positions)), replace=False))
+        return self.page(chosen, 0, len(chosen), columns)
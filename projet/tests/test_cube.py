@@ -0,0 +1,94 @@
+import os
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from cube import RATE_DIMENSIONS, FactCube, stream_cube
+from data_store import read_regional_data
+from geometry_store import read_geometry_store
+
+DATA_PATH = os.path.join(PROJECT_DIR, 'data_regional.csv')
+GEOJSON_PATH = os.path.join(PROJECT_DIR, 'regions.geojson')
+
+
+def indicator_cells(cube):
+    # cells of every (classe, unité.de.compte), whatever the order of the indicators in the cube
+    return {(classe, unit): (cube.values[i], cube.counts[i])
+            for i, (classe, unit) in enumerate(zip(cube.classes, cube.units))}
+
+
+def test_stream_cube_matches_from_frame():
+    expected = FactCube.from_frame(read_regional_data(DATA_PATH, sidecar=False))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', FutureWarning)
+        # small chunks, so the categories of the keys differ from one chunk to the other
+        streamed = stream_cube(DATA_PATH, chunksize=300)
+
+    assert streamed.ingestion['rows'] == expected.counts.sum()
+    np.testing.assert_array_equal(streamed.years, expected.years)
+    np.testing.assert_array_equal(streamed.regions, expected.regions)
+    streamed_cells = indicator_cells(streamed)
+    expected_cells = indicator_cells(expected)
+    assert streamed_cells.keys() == expected_cells.keys()
+    for indicator, (values, counts) in expected_cells.items():
+        np.testing.assert_allclose(streamed_cells[indicator][0], values)
+        np.testing.assert_array_equal(streamed_cells[indicator][1], counts)
+
+
+def with_second_unit(df):
+    # every classe of the shipped data has a single unit: the rows of the first classe are repeated
+    # under another unit, so that two indicators of the cube share this classe
+    df = df.astype({'classe': str, 'unité.de.compte': str, 'Code.région': str})
+    extra = df[df['classe'] == df['classe'].iloc[0]].assign(**{'unité.de.compte': 'autre', 'faits': 3})
+    return pd.concat([df, extra], ignore_index=True)
+
+
+def expected_rates(df, by, per=1000):
+    # the same rates with a plain groupby: the facts of every group over the population of its
+    # years and regions, every row repeating the population of its region and year
+    facts = df.groupby(list(by))['faits'].sum().reset_index()
+    population = df.groupby(['annee', 'Code.région'])['POP'].max().reset_index()
+    levels = [dimension for dimension in by if dimension != 'classe']
+    if levels:
+        facts = facts.join(population.groupby(levels)['POP'].sum(), on=levels)
+    else:
+        facts['POP'] = population['POP'].sum()
+    facts = facts.set_index(list(by))
+    return facts['faits'] / facts['POP'] * per
+
+
+def rate_series(coordinates, rates):
+    index = pd.MultiIndex.from_product(list(coordinates.values()), names=list(coordinates))
+    if index.nlevels == 1:
+        index = index.get_level_values(0)
+    return pd.Series(np.ravel(rates), index=index)
+
+
+def test_rates_match_groupby():
+    df = with_second_unit(read_regional_data(DATA_PATH, sidecar=False))
+    cube = FactCube.from_frame(df)
+    assert len(cube.classes) == df['classe'].nunique() + 1
+    for by in (RATE_DIMENSIONS, ('classe',), ('annee',), ('Code.région',), ('classe', 'annee'),
+               ('annee', 'Code.région')):
+        expected = expected_rates(df, by)
+        rates = rate_series(*cube.rates(by=by))
+        assert len(rates) == len(expected), by
+        np.testing.assert_allclose(rates.reindex(expected.index).to_numpy(), expected.to_numpy(), err_msg=str(by))
+
+
+def test_rates_of_regions_absent_from_the_data():
+    df = read_regional_data(DATA_PATH, sidecar=False)
+    df = df[df['Code.région'] != '93'].astype({'Code.région': str, 'classe': str})
+    store = read_geometry_store(GEOJSON_PATH, sidecar=False)
+    regions = np.append(store.codes, '99')
+    coordinates, rates = FactCube.from_frame(df).rates(by=('annee', 'Code.région'), regions=regions)
+
+    np.testing.assert_array_equal(coordinates['Code.région'], regions)
+    missing = np.isin(regions, ['93', '99'])
+    assert np.isnan(rates[:, missing]).all()
+    expected = expected_rates(df, ('annee', 'Code.région')).unstack()[regions[~missing]]
+    np.testing.assert_allclose(rates[:, ~missing], expected.loc[coordinates['annee']].to_numpy())
@@ -0,0 +1,67 @@
+import os
+import sys
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from cube import FactCube
+from data_store import CSV_OPTIONS, read_regional_data
+from partition_store import PartitionStore
+
+DATA_PATH = os.path.join(PROJECT_DIR, 'data_regional.csv')
+
+
+def write_csv(df, path, mtime):
+    # explicit mtimes, the files of a test are written within the same clock tick
+    df.to_csv(path, index=False, **CSV_OPTIONS)
+    os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+def facts(cube):
+    return cube.values[..., 0].sum()
+
+
+def assert_same_cube(cube, df):
+    expected = FactCube.from_frame(df)
+    np.testing.assert_array_equal(cube.years, expected.years)
+    assert facts(cube) == facts(expected)
+
+
+def test_year_removed_from_source(tmp_path):
+    df = read_regional_data(DATA_PATH, sidecar=False)
+    source = write_csv(df, tmp_path / 'data.csv', 1_000_000_000)
+    store = PartitionStore(str(tmp_path / 'partitions'))
+    store.refresh([source])
+    assert 16 in store.years
+
+    df = df[df['annee'] != 16]
+    write_csv(df, source, 2_000_000_000)
+    assert 16 in store.refresh([source])
+    assert 16 not in store.years
+    assert not os.path.exists(tmp_path / 'partitions' / 'annee=16')
+    assert_same_cube(store.cube(), df)
+
+
+def test_precedence_does_not_depend_on_the_refresh_order(tmp_path):
+    base = read_regional_data(DATA_PATH, sidecar=False)
+    release = base[base['annee'] == 22].assign(faits=lambda frame: frame['faits'] * 2)
+    base_path = write_csv(base, tmp_path / 'base.csv', 1_000_000_000)
+    release_path = write_csv(release, tmp_path / 'release.csv', 1_000_000_000)
+    store = PartitionStore(str(tmp_path / 'partitions'))
+    store.refresh([base_path, release_path])
+    expected = facts(store.cube())
+    assert expected == facts(FactCube.from_frame(base[base['annee'] != 22])) + facts(FactCube.from_frame(release))
+
+    # the base is re-ingested after the release: the release keeps its year
+    write_csv(base, base_path, 2_000_000_000)
+    store.refresh([base_path])
+    assert facts(store.cube()) == expected
+    # and the precedence is kept in the manifest
+    assert facts(PartitionStore(str(tmp_path / 'partitions')).cube()) == expected
+
+    # the year removed from the release is taken again from the base
+    write_csv(release[release['annee'] != 22], release_path, 3_000_000_000)
+    assert 22 in store.refresh([release_path])
+    assert_same_cube(store.cube(), base)
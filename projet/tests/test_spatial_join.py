@@ -0,0 +1,42 @@
+import os
+import sys
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from geometry_store import GeometryStore, read_geometry_store
+from spatial_join import RegionAssigner
+
+GEOJSON_PATH = os.path.join(PROJECT_DIR, 'regions.geojson')
+
+
+def test_positions_match_sjoin():
+    store = read_geometry_store(GEOJSON_PATH, sidecar=False)
+    xmin, ymin = store.bounds[:, :2].min(axis=0)
+    xmax, ymax = store.bounds[:, 2:].max(axis=0)
+    rng = np.random.default_rng(0)
+    longitude, latitude = rng.uniform(xmin, xmax, 20_000), rng.uniform(ymin, ymax, 20_000)
+    # small batches, so the points of a region are spread over several of them
+    positions = RegionAssigner(store).positions(longitude, latitude, batch_size=3_000)
+
+    points = gpd.GeoDataFrame(geometry=gpd.points_from_xy(longitude, latitude), crs=store.crs)
+    regions = gpd.read_file(GEOJSON_PATH)
+    joined = gpd.sjoin(points, regions, predicate='intersects', how='left')
+    # a point in several regions goes to the first one of the file
+    expected = joined['index_right'].groupby(level=0).min().reindex(points.index).fillna(-1)
+    assert 0 < (positions >= 0).sum() < len(positions)
+    np.testing.assert_array_equal(positions, expected.to_numpy(dtype=int))
+
+
+def test_border_goes_to_the_first_region():
+    # two squares sharing the edge x=1, and a third one overlapping the second
+    squares = [box(0, 0, 1, 1), box(1, 0, 2, 1), box(1.5, 0, 2.5, 1)]
+    for codes in (['A', 'B', 'C'], ['B', 'A', 'C']):
+        store = GeometryStore(gpd.GeoDataFrame({'code': codes}, geometry=squares, crs='EPSG:4326'))
+        # on the shared edge, on the outer edge, inside the overlap, outside every square
+        codes = RegionAssigner(store).codes([1.0, 0.0, 1.75, 3.0], [0.5, 0.5, 0.5, 0.5])
+        assert list(codes[:3]) == [store.codes[0], store.codes[0], store.codes[1]]
+        assert codes.isna()[3]
@@ -0,0 +1,37 @@
+import os
+import sys
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from data_store import read_regional_data
+from table_index import TableIndex
+
+DATA_PATH = os.path.join(PROJECT_DIR, 'data_regional.csv')
+
+
+def test_positions_match_boolean_masks():
+    df = read_regional_data(DATA_PATH, sidecar=False)
+    table = TableIndex(df)
+    classe = df['classe'].iloc[0]
+    for filters in ({'classe': classe}, {'classe': classe, 'annee': 18},
+                    {'classe': classe, 'annee': 18, 'Code.région': '11'}, {'annee': 18, 'Code.région': '11'},
+                    {'classe': classe, 'annee': 99}, {}):
+        mask = np.ones(len(df), dtype=bool)
+        for name, value in filters.items():
+            mask &= (df[name] == value).to_numpy()
+        np.testing.assert_array_equal(table.positions(filters), np.flatnonzero(mask), err_msg=str(filters))
+
+
+def test_sort_matches_sort_values():
+    df = read_regional_data(DATA_PATH, sidecar=False)
+    table = TableIndex(df)
+    # every row, a large part of the table (precomputed order) and a few rows (sorted on their ranks)
+    subsets = (np.arange(len(df)), table.positions({'annee': 18}), table.positions({'annee': 18, 'Code.région': '11'}))
+    for name in ('classe', 'Code.région', 'faits', 'tauxpourmille'):
+        for descending in (False, True):
+            for positions in subsets:
+                expected = df.iloc[positions].sort_values(name, ascending=not descending, kind='stable').index
+                np.testing.assert_array_equal(table.sort(positions, name, descending), expected.to_numpy(),
+                                              err_msg=f'{name} descending={descending} rows={len(positions)}')
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+
+from figure_cache import figure_key, figure_path, write_figure
+from figure_pool import load, run_jobs
+from figures import build_figure, figure_inputs, figure_jobs, FIGURE_BUILDERS
+
+# Warm-up of the figure cache of the app after a deploy or a data refresh: every figure the
+# widgets of the Visualisation page can ask for (every classe, year and mode) is built by a pool
+# of processes and written to the directory read by the app (functions.FIGURE_CACHE_DIR) under the
+# hash of its inputs, so the first visitor reads the figures instead of building them:
+#
+#   python projet/warm_figures.py
+#
+# The data and the geometry are loaded like in the app, so the versions in the inputs are the same.
+# The inputs also hold the version of the builders (figures.BUILDER_VERSION), so after a deploy that
+# changed them every figure is built again. Figures already on disk are skipped, and --prune removes
+# the figures of previous data or builder versions.
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _warm(cube, store, chart, params, path):
+    # builds one figure in a worker and writes it to the cache, returns its size in bytes
+    write_figure(path, build_figure(chart, cube, store, **params))
+    return os.path.getsize(path)
+
+
+def prune(directory, keep):
+    # removes the cached figures that are not in `keep` (paths), returns how many were removed
+    removed = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if path not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build every figure of the Visualisation page into the figure cache')
+    parser.add_argument('--data', default=os.path.join(PROJECT_DIR, 'data_regional.csv'))
+    parser.add_argument('--geojson', default=os.path.join(PROJECT_DIR, 'regions.geojson'))
+    parser.add_argument('--cache', default=os.path.join(PROJECT_DIR, 'figure_cache'))
+    parser.add_argument('--charts', nargs='+', choices=sorted(FIGURE_BUILDERS), help='only warm these charts')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--prune', action='store_true', help='remove the figures of other data or builder versions')
+    args = parser.parse_args()
+
+    # the partitions are refreshed here once, the workers then only read them
+    cube, store = load(args.data, args.geojson)
+    jobs = {}
+    for chart, params in figure_jobs(cube, args.charts):
+        path = figure_path(args.cache, figure_key(chart, figure_inputs(chart, cube, store, **params)))
+        jobs[path] = (chart, params)
+    missing = {path: job for path, job in jobs.items() if not os.path.exists(path)}
+    print(f'{len(jobs)} figures, {len(jobs) - len(missing)} already cached, '
+          f'{len(missing)} to build with {args.workers} workers')
+
+    start = time.perf_counter()
+    results, failures = run_jobs(_warm, [(chart, params, (path,)) for path, (chart, params) in missing.items()],
+                                 args.data, args.geojson, args.workers)
+    written = sum(size for _, _, size in results)
+
+    print(f'{len(missing) - failures} figures ({written / 1024 ** 2:.1f} MB) written in '
+          f'{time.perf_counter() - start:.1f} s to {args.cache}')
+    if args.prune and not args.charts:
+        print(f'{prune(args.cache, set(jobs))} figures of previous versions removed')
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()